@@ -41,6 +41,9 @@ INSTALLED_APPS = [
     "investments",
 ]
 
+# Kernel de la serie temporal compilado con Numba (requiere `pip install numba`)
+INVESTMENTS_USE_NUMBA = False
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
@@ -88,6 +91,19 @@ DATABASES = {
 }
 
 
+# Cache
+# Compartida entre procesos (runserver/gunicorn workers y `manage.py import_xlsx`): las invalidaciones
+# de investments (señales, bump_price_matrix_version) tienen que verlas todos. LocMemCache es por proceso.
+# Con varios hosts, usar un backend de red (p. ej. django.core.cache.backends.redis.RedisCache).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.django_cache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,8 +1,12 @@
+import json
+
 from rest_framework import views, response, status
+from rest_framework.utils.encoders import JSONEncoder
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from investments.models import Portfolio, Asset
 from investments.services import apply_trade
-from investments.selectors import portfolio_time_series
+from investments.selectors import portfolio_time_series, iter_portfolio_time_series
 from .serializers import TimeSeriesRequestSerializer
 from investments.selectors import initial_units_for_all_assets, last_price_date
 from .serializers import InitialUnitsSerializer
@@ -37,11 +41,25 @@ class PortfolioTimeSeriesApi(views.APIView):
 
         use_trades = request.query_params.get('use_trades', '1') in ('1', 'true', 'True')
 
+        # ?stream=1 -> NDJSON (una línea por fecha). Los arrays numéricos D x N se calculan igual
+        # antes de la primera línea; lo que se evita es materializar los D dicts/Decimal y el JSON completo.
+        if request.query_params.get('stream', '0') in ('1', 'true', 'True'):
+            rows = iter_portfolio_time_series(
+                portfolio=p, start=fecha_inicio, end=fecha_fin, use_trades=use_trades,
+                as_iso_strings=True,
+            )
+            lines = (
+                json.dumps({"date": d, "Vt": vt, "weights": w}, cls=JSONEncoder) + "\n"
+                for d, vt, w in rows
+            )
+            return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
         data = portfolio_time_series(
-            portfolio=p, start=fecha_inicio, end=fecha_fin, use_trades=use_trades
+            portfolio=p, start=fecha_inicio, end=fecha_fin, use_trades=use_trades,
+            as_iso_strings=True,
         )
         return response.Response({
-            "dates": [d.isoformat() for d in data["dates"]],
+            "dates": data["dates"],
             "Vt": data["Vt"],
             "weights": data["weights"],
             "use_trades": use_trades,
@@ -51,8 +69,16 @@ class TradeApi(views.APIView):
     def post(self, request, portfolio_id):
         p = get_object_or_404(Portfolio, pk=portfolio_id)
         data = request.data
-        a_sell = Asset.objects.get(name=data['asset_sell'])
-        a_buy  = Asset.objects.get(name=data['asset_buy'])
+        names = [data['asset_sell'], data['asset_buy']]
+        assets = Asset.objects.in_bulk(names, field_name='name')
+        missing = [n for n in names if n not in assets]
+        if missing:
+            return response.Response(
+                {"detail": f"Activos no encontrados: {missing}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        a_sell = assets[data['asset_sell']]
+        a_buy  = assets[data['asset_buy']]
         apply_trade(
             portfolio=p, d=data['fecha'],
             asset_sell=a_sell, value_sell=data['value_sell'],
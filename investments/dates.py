@@ -0,0 +1,26 @@
+# investments/dates.py
+from __future__ import annotations
+
+import re
+from datetime import date
+
+# YYYY-MM-DD | DD-MM-YYYY | DD/MM/YYYY (mismo separador en ambos lados).
+# re.ASCII + fullmatch: como strptime, solo dígitos 0-9 y nada después (ni siquiera "\n").
+_DATE_RE = re.compile(r"(?:(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})([-/])(\d{1,2})\5(\d{4}))", re.ASCII)
+
+
+def ensure_date(x) -> date:
+    """Convierte str/fecha a date. Acepta YYYY-MM-DD, DD-MM-YYYY, DD/MM/YYYY."""
+    if isinstance(x, date):
+        return x
+    m = _DATE_RE.fullmatch(str(x))
+    if m:
+        if m.group(1):
+            y, mo, d = m.group(1), m.group(2), m.group(3)
+        else:
+            d, mo, y = m.group(4), m.group(6), m.group(7)
+        try:
+            return date(int(y), int(mo), int(d))
+        except ValueError:
+            pass
+    raise ValueError(f"Fecha inválida: {x!r}")
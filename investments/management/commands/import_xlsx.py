@@ -1,8 +1,26 @@
 import pandas as pd
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
+from itertools import islice
+from django.core.cache import cache
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from investments.models import Asset, Portfolio, Price, InitialWeight
+from investments.selectors import bump_price_matrix_version, initial_units_cache_key, LAST_PRICE_DATE_CACHE_KEY
+from investments.services import invalidate_portfolio_snapshots
+
+try:  # opcional: python-calamine lee xlsx bastante más rápido que openpyxl
+    import python_calamine  # noqa: F401
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+# pandas soporta engine='calamine' recién desde 2.2; antes, default de pandas (openpyxl)
+_PANDAS_VERSION = tuple(int(x) for x in pd.__version__.split('.')[:2])
+EXCEL_ENGINE = 'calamine' if HAS_CALAMINE and _PANDAS_VERSION >= (2, 2) else None
+
+# filas de Price por INSERT
+PRICE_BATCH_SIZE = 10000
 
 
 def _to_decimal(value, *, field_name='valor', allow_empty=False, treat_percent_as_fraction=True):
@@ -43,6 +61,34 @@ def _to_decimal(value, *, field_name='valor', allow_empty=False, treat_percent_a
     return d
 
 
+def _to_decimal_series(series, *, field_name='valor', treat_percent_as_fraction=True) -> list[Decimal]:
+    """
+    Versión vectorizada de _to_decimal para una columna completa: normaliza y valida con ops de
+    string de pandas (sin regex por celda). Los valores salen como Decimal exacto del texto
+    normalizado (nunca pasan por float, así no se pierden dígitos con max_digits=20).
+    Celdas vacías/NaN o no numéricas -> CommandError.
+    """
+    s = series.astype(str).str.strip()
+    pct = s.str.endswith('%')
+    s = s.str.rstrip('%').str.strip().str.replace(',', '.', regex=False)
+
+    # float solo para validar
+    bad = pd.to_numeric(s, errors='coerce').isna()
+    if bad.any():
+        raise CommandError(f"Celdas vacías o no numéricas en {field_name}: {series[bad].head(5).tolist()}")
+
+    out = []
+    for text, had_percent in zip(s.tolist(), pct.tolist()):
+        try:
+            d = Decimal(text)
+        except InvalidOperation:
+            raise CommandError(f"No puedo convertir '{text}' a número válido en {field_name}")
+        if treat_percent_as_fraction and (had_percent or (d > 1 and d <= 100)):
+            d = d / Decimal('100')
+        out.append(d)
+    return out
+
+
 class Command(BaseCommand):
     help = "Importa Weights y Precios desde datos.xlsx (layout específico y robusto)."
 
@@ -54,6 +100,8 @@ class Command(BaseCommand):
         parser.add_argument('--weights-sheet', default=None, help='Nombre exacto de hoja de pesos (ej: weights)')
         parser.add_argument('--prices-sheet', default=None, help='Nombre exacto de hoja de precios (ej: precios)')
 
+    # Todo en una transacción: los snapshots se recalculan una sola vez, al commit, con los datos nuevos
+    @transaction.atomic
     def handle(self, *args, **opts):
         xlsx_path = opts['xlsx_path']
 
@@ -67,7 +115,7 @@ class Command(BaseCommand):
 
         # 2) Abrir Excel
         try:
-            xls = pd.ExcelFile(xlsx_path)
+            xls = pd.ExcelFile(xlsx_path, engine=EXCEL_ENGINE)
         except Exception as e:
             raise CommandError(f"No pude abrir {xlsx_path}: {e}")
 
@@ -143,19 +191,36 @@ class Command(BaseCommand):
                 f"Fechas disponibles: {fechas_disponibles[:10]}{'...' if len(fechas_disponibles)>10 else ''}"
             )
 
-        count_weights = 0
-        for _, row in dfw_t0.iterrows():
-            asset_name = str(row[asset_col]).strip()
-            if not asset_name or asset_name.lower() in ('nan', 'none'):
-                continue
-            a, _ = Asset.objects.get_or_create(name=asset_name)
-
-            w1 = _to_decimal(row[p1_col], field_name=f"Weights[{asset_name}]-P1", allow_empty=False)
-            w2 = _to_decimal(row[p2_col], field_name=f"Weights[{asset_name}]-P2", allow_empty=False)
-
-            InitialWeight.objects.update_or_create(portfolio=p1, asset=a, defaults={'weight': w1})
-            InitialWeight.objects.update_or_create(portfolio=p2, asset=a, defaults={'weight': w2})
-            count_weights += 1
+        names = dfw_t0[asset_col].astype(str).str.strip()
+        dfw_t0 = dfw_t0[(names != '') & ~names.str.lower().isin(['nan', 'none'])]
+        names = names[dfw_t0.index]
+
+        w1_list = _to_decimal_series(dfw_t0[p1_col], field_name="Weights-P1")
+        w2_list = _to_decimal_series(dfw_t0[p2_col], field_name="Weights-P2")
+
+        # Bulk: 1 insert de Asset, 1 lectura por nombre y 1 upsert de InitialWeight (en vez de 3 queries por fila)
+        w_by_name = {}
+        for asset_name, w1, w2 in zip(names.tolist(), w1_list, w2_list):
+            w_by_name[asset_name] = (w1, w2)
+        count_weights = len(w_by_name)
+
+        Asset.objects.bulk_create([Asset(name=n) for n in w_by_name], ignore_conflicts=True)
+        assets = Asset.objects.in_bulk(list(w_by_name), field_name='name')
+        InitialWeight.objects.bulk_create(
+            [
+                InitialWeight(portfolio=p, asset=assets[n], weight=w)
+                for n, (w1, w2) in w_by_name.items()
+                for p, w in ((p1, w1), (p2, w2))
+            ],
+            update_conflicts=True,
+            unique_fields=['portfolio', 'asset'],
+            update_fields=['weight'],
+        )
+        # bulk_create no dispara post_save: invalidamos las unidades iniciales cacheadas y los snapshots a mano
+        cache.delete_many([initial_units_cache_key(p.id, p.initial_date) for p in (p1, p2)])
+        # (sin refresh: tras los precios se invalidan todos y se recalculan al commit)
+        for p in (p1, p2):
+            invalidate_portfolio_snapshots(portfolio_id=p.id, refresh=False)
 
         # Guarda el set de activos válidos (los que existen en weights para t0)
         assets_t0 = list(InitialWeight.objects.filter(portfolio__in=[p1, p2])
@@ -170,8 +235,6 @@ class Command(BaseCommand):
         #   - Columnas de activos deben ser las mismas que en weights (t0)
         #   - Import rápido con bulk_create por lotes
         # =========================
-        from django.db import transaction
-
         dfp = df_p.copy()
 
         # Normaliza cabeceras (quedará 'date' + nombres de activos)
@@ -210,7 +273,7 @@ class Command(BaseCommand):
 
         # Opcional: si hay columnas extra en precios que no están en weights, las ignoramos
         use_cols = ['date'] + assets_t0
-        dfp = dfp[use_cols]
+        dfp = dfp[use_cols].copy()
 
         print(f"[Precios] shape={dfp.shape} (filas x columnas). Importando {len(assets_t0)} activos en lotes...")
 
@@ -222,37 +285,32 @@ class Command(BaseCommand):
             Asset.objects.bulk_create([Asset(name=n) for n in missing_assets], ignore_conflicts=True)
             asset_map.update({a.name: a for a in Asset.objects.filter(name__in=missing_assets)})
 
-        # Bulk insert de Price
-        BATCH_SIZE = 5000
-        batch = []
-        created_total = 0
+        # Coerción numérica por columna (sin _to_decimal por celda) y formato largo (date, asset, price)
+        for asset_name in assets_t0:
+            dfp[asset_name] = _to_decimal_series(
+                dfp[asset_name], field_name=f"Precio[{asset_name}]", treat_percent_as_fraction=False
+            )
+        long = dfp.melt(id_vars='date', value_vars=assets_t0, var_name='asset', value_name='price')
 
-        def flush_batch():
-            nonlocal batch, created_total
-            if not batch:
-                return
-            Price.objects.bulk_create(batch, batch_size=2000, ignore_conflicts=True)
-            created_total += len(batch)
-            batch = []
+        long['asset_id'] = long['asset'].map({name: a.id for name, a in asset_map.items()})
 
+        # Bulk insert de Price por lotes: los Price(...) se generan bajo demanda, así solo hay
+        # PRICE_BATCH_SIZE instancias en memoria a la vez (no D·N)
+        objs = (
+            Price(asset_id=aid, date=d, price=v)
+            for d, aid, v in zip(long['date'].tolist(), long['asset_id'].tolist(), long['price'].tolist())
+        )
+        created_total = 0
         with transaction.atomic():
-            for r_idx, row in dfp.iterrows():
-                d = row['date']
-                for asset_name in assets_t0:
-                    a = asset_map[asset_name]
-                    raw = row[asset_name]
-                    # Convierte a Decimal (sin % en precios)
-                    price = _to_decimal(raw, field_name=f"Precio[{asset_name}] {d}",
-                                        allow_empty=False, treat_percent_as_fraction=False)
-                    batch.append(Price(asset=a, date=d, price=price))
-                    if len(batch) >= BATCH_SIZE:
-                        flush_batch()
-                # progreso
-                # if (r_idx + 1) % 50 == 0:
-                #     print(f"[Precios] filas procesadas: {r_idx + 1}/{dfp.shape[0]}")
-
-            flush_batch()
-        
+            while batch := list(islice(objs, PRICE_BATCH_SIZE)):
+                Price.objects.bulk_create(batch, ignore_conflicts=True)
+                created_total += len(batch)
+        # bulk_create no dispara post_save: invalidamos las matrices de estos activos, la última fecha y
+        # los snapshots a mano
+        bump_price_matrix_version(asset_ids=[a.id for a in asset_map.values()])
+        cache.delete(LAST_PRICE_DATE_CACHE_KEY)
+        invalidate_portfolio_snapshots()
+
         # print(df_w.head(10))
         # print(df_w.dtypes)
 
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from investments.models import Portfolio, Price
+from investments.services import invalidate_portfolio_snapshots, refresh_portfolio_snapshots
+
+
+class Command(BaseCommand):
+    help = "Borra y recalcula los PortfolioSnapshot (t0 .. última fecha de precios) desde la DB."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--portfolio', type=int, action='append', dest='portfolios',
+                            help='id de portafolio (repetible); por defecto todos')
+        parser.add_argument('--clear', action='store_true',
+                            help='Solo borrar; los gráficos calculan en vivo hasta volver a correr el comando')
+
+    def handle(self, *args, **opts):
+        portfolios = Portfolio.objects.order_by('id')
+        if opts['portfolios']:
+            portfolios = portfolios.filter(id__in=opts['portfolios'])
+
+        # Sin last_price_date(): acá no queremos depender de la cache
+        last = Price.objects.aggregate(last=Max('date'))['last']
+
+        for p in portfolios:
+            invalidate_portfolio_snapshots(portfolio_id=p.id, refresh=False)
+            if opts['clear']:
+                self.stdout.write(f"Snapshots de '{p}' borrados.")
+                continue
+            if last is None or last < p.initial_date:
+                self.stdout.write(self.style.WARNING(f"'{p}': no hay precios desde t0={p.initial_date}."))
+                continue
+            try:
+                created = refresh_portfolio_snapshots(portfolio=p, end=last)
+            except ValueError as e:
+                self.stdout.write(self.style.WARNING(f"'{p}': {e}"))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"'{p}': {created} snapshots ({p.initial_date} .. {last})."
+            ))
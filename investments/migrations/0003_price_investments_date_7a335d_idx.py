@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-14 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0002_alter_portfolio_initial_value'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='price',
+            index=models.Index(fields=['date', 'asset'], name='investments_date_7a335d_idx'),
+        ),
+    ]
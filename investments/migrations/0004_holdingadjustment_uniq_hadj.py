@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-14 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0003_price_investments_date_7a335d_idx'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='holdingadjustment',
+            constraint=models.UniqueConstraint(fields=('portfolio', 'asset', 'effective_date', 'delta_units'), name='uniq_hadj'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-14 04:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0004_holdingadjustment_uniq_hadj'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='holdingadjustment',
+            name='investments_portfol_e153d2_idx',
+        ),
+    ]
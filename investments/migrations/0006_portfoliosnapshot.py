@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-14 04:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0005_remove_holdingadjustment_investments_portfol_e153d2_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('value', models.DecimalField(decimal_places=2, max_digits=24)),
+                ('weights_json', models.JSONField(default=dict)),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='investments.portfolio')),
+            ],
+            options={
+                'unique_together': {('portfolio', 'date')},
+            },
+        ),
+    ]
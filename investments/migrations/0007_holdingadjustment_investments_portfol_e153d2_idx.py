@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-14 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0006_portfoliosnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='holdingadjustment',
+            index=models.Index(fields=['portfolio', 'asset', 'effective_date'], name='investments_portfol_e153d2_idx'),
+        ),
+    ]
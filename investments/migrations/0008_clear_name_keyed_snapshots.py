@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def clear_snapshots(apps, schema_editor):
+    # weights_json pasó de {nombre: w} a {asset_id: w}; los viejos se recalculan con rebuild_snapshots
+    apps.get_model('investments', 'PortfolioSnapshot').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investments', '0007_holdingadjustment_investments_portfol_e153d2_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_snapshots, migrations.RunPython.noop),
+    ]
@@ -27,6 +27,9 @@ class Price(models.Model):
 
     class Meta:
         unique_together = ('asset', 'date')
+        indexes = [
+            models.Index(fields=['date', 'asset'])
+        ]
 
 
 class InitialWeight(models.Model):
@@ -45,6 +48,24 @@ class HoldingAdjustment(models.Model):
     delta_units = models.DecimalField(max_digits=24, decimal_places=10)
 
     class Meta:
+        # Índice explícito para los filtros por (portfolio, asset, effective_date__lte) de
+        # services._delta_until / selectors._adjustments_cumsum; uniq_hadj es solo para idempotencia.
         indexes = [
             models.Index(fields=['portfolio', 'asset', 'effective_date'])
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['portfolio', 'asset', 'effective_date', 'delta_units'], name='uniq_hadj'
+            )
+        ]
+
+
+class PortfolioSnapshot(models.Model):
+    """V_t y w_{i,t} (con trades) materializados por día; weights_json = {asset_id: w}. Ver services.refresh_portfolio_snapshots."""
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name='snapshots')
+    date = models.DateField()
+    value = models.DecimalField(max_digits=24, decimal_places=2)
+    weights_json = models.JSONField(default=dict)
+
+    class Meta:
+        unique_together = ('portfolio', 'date')
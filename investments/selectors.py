@@ -1,45 +1,82 @@
 # investments/selectors.py
 from __future__ import annotations
 
-from datetime import datetime, timedelta, date
+import hashlib
+import time
+from datetime import timedelta, date
 from decimal import Decimal, ROUND_HALF_UP
-from collections import defaultdict
 
-from django.db.models import Sum, Max
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum, Max, Min
 
-from investments.models import Portfolio, Asset, Price, InitialWeight, HoldingAdjustment
+from investments.dates import ensure_date
+from investments.models import Portfolio, Asset, Price, InitialWeight, HoldingAdjustment, PortfolioSnapshot
 
 
 # ---------- Helpers de fechas y decimales ----------
 
-def _ensure_date(x) -> date:
-    """Convierte str/fecha a date. Acepta YYYY-MM-DD, DD-MM-YYYY, DD/MM/YYYY."""
-    if isinstance(x, date):
-        return x
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y"):
-        try:
-            return datetime.strptime(str(x), fmt).date()
-        except (TypeError, ValueError):
-            continue
-    raise ValueError(f"Fecha inválida: {x!r}")
-
 def daterange(start, end):
     """Genera fechas día a día (incluye extremos)."""
-    start = _ensure_date(start)
-    end = _ensure_date(end)
+    start = ensure_date(start)
+    end = ensure_date(end)
     d = start
     while d <= end:
         yield d
         d += timedelta(days=1)
 
+def _dates(start: date, end: date) -> np.ndarray:
+    """Array (objeto) de fechas día a día (incluye extremos), construido de una vez con pandas."""
+    return pd.date_range(start, end, freq="D").date
+
+def _iso_dates(start: date, end: date) -> list[str]:
+    """Mismas fechas que _dates pero como 'YYYY-MM-DD', formateadas en lote por NumPy."""
+    return np.datetime_as_string(pd.date_range(start, end, freq="D").values, unit="D").tolist()
+
 def _q(x) -> Decimal:
     """Convierte a Decimal de forma segura."""
     return x if isinstance(x, Decimal) else Decimal(str(x))
 
 
+# ---------- Helpers de cache ----------
+
+def _cache_get_or_set(key: str, compute, timeout):
+    """
+    Como cache.get_or_set, pero sin escribir dentro de una transacción abierta: lo calculado ahí
+    puede incluir escrituras sin commit, y un rollback no invalida la cache.
+    """
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if not connection.in_atomic_block:
+            cache.set(key, value, timeout)
+    return value
+
+
 # ---------- Cálculo de unidades iniciales (C_{i,0}) ----------
 
+INITIAL_UNITS_CACHE_TIMEOUT = 3600
+
+
+def initial_units_cache_key(portfolio_id: int, t0: date) -> str:
+    return f"pf:iu:{portfolio_id}:{t0.isoformat()}"
+
+
 def _compute_initial_units_once(portfolio: Portfolio) -> tuple[dict[int, Decimal], dict[int, str]]:
+    """
+    Versión cacheada de _compute_initial_units_uncached (Django cache).
+    La invalidación vive en investments/signals.py.
+    """
+    key = initial_units_cache_key(portfolio.id, portfolio.initial_date)
+    return _cache_get_or_set(
+        key, lambda: _compute_initial_units_uncached(portfolio), INITIAL_UNITS_CACHE_TIMEOUT
+    )
+
+
+def _compute_initial_units_uncached(portfolio: Portfolio) -> tuple[dict[int, Decimal], dict[int, str]]:
     """
     Devuelve:
       - base_units: {asset_id -> Decimal(unidades iniciales)}
@@ -49,31 +86,27 @@ def _compute_initial_units_once(portfolio: Portfolio) -> tuple[dict[int, Decimal
     t0 = portfolio.initial_date
     V0 = _q(portfolio.initial_value)
 
-    # Pesos iniciales y sus assets en una query
+    # Pesos iniciales con el nombre del asset en una query (tuplas, sin instanciar modelos)
     iweights = list(
-        InitialWeight.objects.select_related("asset").filter(portfolio=portfolio)
+        InitialWeight.objects.filter(portfolio=portfolio).values_list("asset_id", "asset__name", "weight")
     )
     if not iweights:
         raise ValueError(f"No hay pesos iniciales para el portafolio '{portfolio}'.")
 
-    assets = [iw.asset for iw in iweights]
-    asset_ids = [a.id for a in assets]
+    asset_ids = [aid for aid, _, _ in iweights]
 
     # Precios al t0 para todos esos assets en una query
-    p0_map = {
-        p.asset_id: p.price
-        for p in Price.objects.filter(asset_id__in=asset_ids, date=t0)
-    }
+    p0_map = dict(Price.objects.filter(asset_id__in=asset_ids, date=t0).values_list("asset_id", "price"))
 
     base_units: dict[int, Decimal] = {}
-    asset_name: dict[int, str] = {a.id: a.name for a in assets}
+    asset_name: dict[int, str] = {aid: name for aid, name, _ in iweights}
 
-    for iw in iweights:
-        p0 = p0_map.get(iw.asset_id)
+    for aid, name, weight in iweights:
+        p0 = p0_map.get(aid)
         if p0 is None:
-            raise ValueError(f"Falta precio inicial (t0={t0}) para activo '{iw.asset.name}'.")
-        units = (_q(iw.weight) * V0 / _q(p0)).quantize(Decimal("0.00000001"), rounding=ROUND_HALF_UP)
-        base_units[iw.asset_id] = units
+            raise ValueError(f"Falta precio inicial (t0={t0}) para activo '{name}'.")
+        # Sin cuantizar: la precisión completa se mantiene y solo se redondea en la salida
+        base_units[aid] = _q(weight) * V0 / _q(p0)
 
     return base_units, asset_name
 
@@ -81,20 +114,24 @@ def _compute_initial_units_once(portfolio: Portfolio) -> tuple[dict[int, Decimal
 def initial_units_for_all_assets(*, portfolio: Portfolio) -> list[dict]:
     """
     Estructura para API: [{"asset": "EEUU", "units": Decimal(...)}, ...]
-    Ordenada alfabéticamente por nombre de activo.
+    Ordenada alfabéticamente por nombre de activo; unidades cuantizadas a 8 decimales.
     """
     base_units, asset_name = _compute_initial_units_once(portfolio)
-    rows = [{"asset": asset_name[aid], "units": base_units[aid]} for aid in base_units.keys()]
+    q8 = Decimal("0.00000001")
+    rows = [
+        {"asset": asset_name[aid], "units": units.quantize(q8, rounding=ROUND_HALF_UP)}
+        for aid, units in base_units.items()
+    ]
     rows.sort(key=lambda r: r["asset"])
     return rows
 
 
 # ---------- Ajustes acumulados (trades) por rango ----------
 
-def _adjustments_cumsum(portfolio: Portfolio, start: date, end: date) -> dict[tuple[int, date], Decimal]:
+def _adjustments_cumsum(portfolio: Portfolio, start: date, end: date) -> pd.DataFrame:
     """
-    Para cada (asset_id, fecha del rango), retorna la suma acumulada de delta_units
-    hasta esa fecha (incluida). Si no hubo ajustes para un par, no habrá key.
+    Matriz (fecha x asset_id) con la suma acumulada (float) de delta_units hasta cada
+    fecha del rango (incluida). Los activos sin ajustes no aparecen como columna.
     """
     qs = (
         HoldingAdjustment.objects
@@ -104,31 +141,243 @@ def _adjustments_cumsum(portfolio: Portfolio, start: date, end: date) -> dict[tu
         .order_by("asset_id", "effective_date")
     )
 
-    per_asset = defaultdict(list)
-    for r in qs:
-        per_asset[r["asset_id"]].append((r["effective_date"], _q(r["total"] or 0)))
+    all_dates = pd.date_range(start, end, freq="D")
+    df = pd.DataFrame(list(qs), columns=["asset_id", "effective_date", "total"])
+    if df.empty:
+        return pd.DataFrame(index=all_dates, dtype=float)
+
+    df["effective_date"] = pd.to_datetime(df["effective_date"])
+    df["total"] = df["total"].astype(float)
+    piv = df.pivot(index="effective_date", columns="asset_id", values="total").fillna(0).cumsum()
+    # ffill arrastra los ajustes anteriores a `start` y los posteriores al último trade
+    return piv.reindex(all_dates, method="ffill").fillna(0)
+
+
+# ---------- Matriz cacheada de precios/ajustes por portafolio ----------
+
+PRICE_MATRIX_CACHE_TIMEOUT = 3600
+
+
+# Versiones (time_ns) que entran en la key de cada matriz: una por portafolio (sus HoldingAdjustment)
+# y una por activo (sus Price). Una escritura solo invalida las matrices que la incluyen.
+def _portfolio_version_key(portfolio_id: int) -> str:
+    return f"pricemat:v:pf:{portfolio_id}"
+
+
+def _asset_version_key(asset_id: int) -> str:
+    return f"pricemat:v:asset:{asset_id}"
+
+
+def _versions(keys: list[str]) -> list[int]:
+    found = cache.get_many(keys)
+    missing = [k for k in keys if k not in found]
+    if missing:
+        now = time.time_ns()
+        for k in missing:
+            cache.add(k, now, None)
+        found.update(cache.get_many(missing))
+    return [found.get(k, 0) for k in keys]
+
+
+def bump_price_matrix_version(*, portfolio_ids=(), asset_ids=()) -> None:
+    """
+    Invalida las matrices cacheadas que incluyen esos portafolios (tras escribir HoldingAdjustment)
+    o esos activos (tras escribir Price).
+    """
+    now = time.time_ns()
+    cache.set_many(
+        {_portfolio_version_key(pid): now for pid in portfolio_ids}
+        | {_asset_version_key(aid): now for aid in asset_ids},
+        None,
+    )
+
 
-    all_dates = list(daterange(start, end))
-    out: dict[tuple[int, date], Decimal] = {}
+def _price_matrix_key(portfolio: Portfolio, asset_ids: list[int]) -> str:
+    versions = _versions([_portfolio_version_key(portfolio.id)] + [_asset_version_key(aid) for aid in asset_ids])
+    digest = hashlib.sha1(repr((asset_ids, versions)).encode()).hexdigest()
+    return f"pricemat:{portfolio.id}:{digest}"
 
-    for aid, series in per_asset.items():
-        cum = Decimal("0")
-        idx = 0
-        for d in all_dates:
-            while idx < len(series) and series[idx][0] <= d:
-                cum += series[idx][1]
-                idx += 1
-            out[(aid, d)] = cum
 
-    return out
+def _build_price_matrix(portfolio: Portfolio, asset_ids: list[int], lo: date, hi: date) -> dict:
+    """
+    Matrices densas sobre la grilla diaria de precios de los activos dentro de [lo, hi]:
+      - grid:   np.ndarray[datetime64[D]] (T,)
+      - prices: (T x N) float64, NaN = sin precio
+      - adj:    (T x N) float64, ajustes acumulados (incluye los anteriores a lo)
+      - span:   (lo, hi) pedido; fuera de él la matriz no tiene datos
+    """
+    prices_qs = Price.objects.filter(asset_id__in=asset_ids, date__range=(lo, hi))
+    bounds = prices_qs.aggregate(first=Min("date"), last=Max("date"))
+    if bounds["first"] is None:
+        grid = np.array([], dtype="datetime64[D]")
+        empty = np.zeros((0, len(asset_ids)))
+        return {"asset_ids": asset_ids, "span": (lo, hi), "grid": grid, "prices": empty, "adj": empty}
+
+    first, last = bounds["first"], bounds["last"]
+    grid = np.arange(np.datetime64(first, "D"), np.datetime64(last, "D") + 1)
+    aid_to_j = {aid: j for j, aid in enumerate(asset_ids)}
+
+    # Pivot (fecha, activo) -> (T x N) con una sola asignación indexada
+    ii, jj, vals = [], [], []
+    for aid, d, price in prices_qs.values_list("asset_id", "date", "price"):
+        ii.append((d - first).days)
+        jj.append(aid_to_j[aid])
+        vals.append(price)
+    prices = np.full((len(grid), len(asset_ids)), np.nan)
+    prices[ii, jj] = np.array(vals, dtype="float64")
+
+    adj = _adjustments_cumsum(portfolio, first, last).reindex(columns=asset_ids, fill_value=0.0).to_numpy()
+    return {"asset_ids": asset_ids, "span": (lo, hi), "grid": grid, "prices": prices, "adj": adj}
+
+
+def _price_matrix(portfolio: Portfolio, asset_ids: list[int], start: date, end: date) -> dict:
+    """
+    Versión cacheada de _build_price_matrix, versionada por portafolio y por activo.
+    Cubre [min(t0, start), máx(end) pedido]: si la cacheada no alcanza, se reconstruye sobre la unión.
+    """
+    key = _price_matrix_key(portfolio, asset_ids)
+    lo, hi = min(portfolio.initial_date, start), end
+    mat = cache.get(key)
+    if mat is not None and mat["asset_ids"] == asset_ids:
+        if mat["span"][0] <= lo and hi <= mat["span"][1]:
+            return mat
+        lo, hi = min(lo, mat["span"][0]), max(hi, mat["span"][1])
+    mat = _build_price_matrix(portfolio, asset_ids, lo, hi)
+    if not connection.in_atomic_block:  # ver _cache_get_or_set
+        cache.set(key, mat, PRICE_MATRIX_CACHE_TIMEOUT)
+    return mat
+
+
+# ---------- Kernels numéricos (NumPy / Numba opcional) ----------
+
+def _compute_series_kernel(prices: np.ndarray, has_price: np.ndarray, base_vec: np.ndarray, adj: np.ndarray | None):
+    """
+    Devuelve (V_t sin redondear (T,), value = C_{i,t} * P_{i,t} (T x N)).
+    Sin trades las unidades son constantes y V_t es un producto matriz-vector (BLAS);
+    con trades, einsum fusiona multiplicación y suma por fila.
+    """
+    prices0 = np.where(has_price, prices, 0.0)
+    if adj is None:
+        return prices0 @ base_vec, base_vec[None, :] * prices
+    units = base_vec[None, :] + adj
+    return np.einsum("ij,ij->i", units, prices0), units * prices
+
+
+def _compute_series_kernel_numba_py(prices: np.ndarray, units: np.ndarray):
+    """Mismo resultado que _compute_series_kernel, como loop explícito para compilar con Numba."""
+    T, N = prices.shape
+    Vt = np.zeros(T)
+    value = np.empty((T, N))
+    for i in prange(T):
+        s = 0.0
+        for j in range(N):
+            v = units[i, j] * prices[i, j]
+            value[i, j] = v
+            if not np.isnan(v):
+                s += v
+        Vt[i] = s
+    return Vt, value
+
+
+try:  # opcional: numba (pip install numba)
+    from numba import njit, prange
+    # fastmath=False: fastmath asume que no hay NaN y rompería el chequeo de precios faltantes
+    _compute_series_kernel_numba = njit(cache=True, parallel=True)(_compute_series_kernel_numba_py)
+    HAS_NUMBA = True
+except ImportError:
+    prange = range
+    _compute_series_kernel_numba = _compute_series_kernel_numba_py
+    HAS_NUMBA = False
+
+
+def _numba_enabled() -> bool:
+    """Feature flag: settings.INVESTMENTS_USE_NUMBA (default False) y numba instalado."""
+    return HAS_NUMBA and getattr(settings, "INVESTMENTS_USE_NUMBA", False)
 
 
 # ---------- Serie temporal (V_t y w_{i,t}) ----------
 
-def portfolio_time_series(*, portfolio: Portfolio, start, end, use_trades: bool = True) -> dict:
+def iter_portfolio_time_series(
+    *, portfolio: Portfolio, start: date, end: date, use_trades: bool = True, as_iso_strings: bool = False,
+    use_cache: bool = True, weights_by_asset_id: bool = False,
+):
+    """
+    Igual que portfolio_time_series pero devuelve un generador de filas
+    (date, V_t: Decimal, {asset_name: Decimal(w_{i,t})}) para poder hacer streaming.
+    Las queries y la matemática matricial se ejecutan al llamar (no al iterar),
+    así los errores salen antes de empezar a responder.
+    Con as_iso_strings=True la fecha de cada fila es un str 'YYYY-MM-DD'.
+    start/end deben llegar ya parseados (views/serializers); aquí no se re-parsean.
+    use_cache=False lee unidades y precios directo de la DB (lo usan los snapshots, que persisten).
+    weights_by_asset_id=True usa asset_id como clave de los pesos en vez del nombre.
+    """
+
+    # 1) Unidades base al t0 y nombres
+    if use_cache:
+        base_units, asset_name = _compute_initial_units_once(portfolio)
+    else:
+        base_units, asset_name = _compute_initial_units_uncached(portfolio)
+    asset_ids = list(base_units.keys())
+
+    # 2) Matriz completa de precios/ajustes (cacheada salvo use_cache=False)
+    if use_cache:
+        mat = _price_matrix(portfolio, asset_ids, start, end)
+    else:
+        mat = _build_price_matrix(portfolio, asset_ids, start, end)
+
+    dates = _dates(start, end)
+    D, N = len(dates), len(asset_ids)
+
+    # 3) Recorte [start, end] de la matriz (NaN = sin precio); fuera de la grilla no hay precios
+    price_arr = np.full((D, N), np.nan)
+    adj_arr = np.zeros((D, N))
+    grid = mat["grid"]
+    i0 = np.searchsorted(grid, np.datetime64(start, "D"), side="left")
+    i1 = np.searchsorted(grid, np.datetime64(end, "D"), side="right")
+    if i1 > i0:
+        off = int((grid[i0] - np.datetime64(start, "D")).astype(int))
+        price_arr[off:off + (i1 - i0)] = mat["prices"][i0:i1]
+        if use_trades:
+            adj_arr[off:off + (i1 - i0)] = mat["adj"][i0:i1]
+
+    base_vec = np.array([float(base_units[aid]) for aid in asset_ids])
+
+    # 4) V_t y w_{i,t} vectorizados
+    has_price = ~np.isnan(price_arr)
+    if _numba_enabled():
+        units_arr = base_vec[None, :] + adj_arr if use_trades else np.broadcast_to(base_vec, price_arr.shape)
+        Vt, value = _compute_series_kernel_numba(price_arr, np.ascontiguousarray(units_arr))
+    else:
+        Vt, value = _compute_series_kernel(price_arr, has_price, base_vec, adj_arr if use_trades else None)
+    Vt = np.round(Vt, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        W = np.round(value / Vt[:, None], 8)
+
+    names = asset_ids if weights_by_asset_id else [asset_name[aid] for aid in asset_ids]
+    labels = _iso_dates(start, end) if as_iso_strings else dates
+    return _iter_rows(labels, Vt, W, has_price, names)
+
+
+def _iter_rows(dates, Vt, W, has_price, names):
+    # Vuelta a Decimal solo en el borde (ya redondeado en lote), fila a fila
+    for i, d in enumerate(dates):
+        v = float(Vt[i])
+        wmap = {}
+        if v > 0:
+            wmap = {
+                name: Decimal(f"{w:.8f}")
+                for name, w, ok in zip(names, W[i].tolist(), has_price[i].tolist()) if ok
+            }
+        yield d, Decimal(f"{v:.2f}"), wmap
+
+
+def portfolio_time_series(
+    *, portfolio: Portfolio, start: date, end: date, use_trades: bool = True, as_iso_strings: bool = False,
+    use_cache: bool = True,
+) -> dict:
     """
     Calcula para el rango [start, end]:
-      - dates: [date, ...]
+      - dates: [date, ...] (o ['YYYY-MM-DD', ...] si as_iso_strings=True)
       - Vt: [Decimal, ...]
       - weights: [ {asset_name: Decimal(w_{i,t}), ...}, ... ]
 
@@ -136,55 +385,72 @@ def portfolio_time_series(*, portfolio: Portfolio, start, end, use_trades: bool
       True  -> incluye ajustes/operaciones (Bonus 2)
       False -> ignora ajustes (como si no existieran trades)
     """
-    start = _ensure_date(start)
-    end = _ensure_date(end)
-
-    # 1) Unidades base al t0 y nombres
-    base_units, asset_name = _compute_initial_units_once(portfolio)
-    asset_ids = list(base_units.keys())
-
-    # 2) Ajustes acumulados por día (según flag)
-    adj_cum = _adjustments_cumsum(portfolio, start, end) if use_trades else {}
-
-    # 3) Precios del rango (UNA consulta) -> mapa
-    prices = (
-        Price.objects
-        .filter(asset_id__in=asset_ids, date__gte=start, date__lte=end)
-        .values("asset_id", "date", "price")
+    dates, vt, weights = [], [], []
+    rows = iter_portfolio_time_series(
+        portfolio=portfolio, start=start, end=end, use_trades=use_trades, as_iso_strings=as_iso_strings,
+        use_cache=use_cache,
     )
-    price_map = {(p["asset_id"], p["date"]): p["price"] for p in prices}
+    for d, v, wmap in rows:
+        dates.append(d)
+        vt.append(v)
+        weights.append(wmap)
+    return {"dates": dates, "Vt": vt, "weights": weights}
 
-    dates, vt, weights = [], [], []
 
-    for d in daterange(start, end):
-        total_v = Decimal("0")
-        xi_by_asset = {}
+# ---------- Snapshots materializados (PortfolioSnapshot) ----------
+# Solo lectura: los rellena services.refresh_portfolio_snapshots (al commit de cada invalidación y
+# con el comando rebuild_snapshots). weights_json va por asset_id (str) y los nombres se leen al servir.
 
-        for aid in asset_ids:
-            units = base_units[aid] + adj_cum.get((aid, d), Decimal("0"))
-            price = price_map.get((aid, d))
-            if price is None:
-                continue
-            xval = units * _q(price)
-            xi_by_asset[aid] = xval
-            total_v += xval
+def _snapshot_rows(portfolio: Portfolio, start: date, end: date) -> list[tuple]:
+    return list(
+        PortfolioSnapshot.objects.filter(portfolio=portfolio, date__range=(start, end))
+        .order_by("date")
+        .values_list("date", "value", "weights_json")
+    )
 
-        total_v = total_v.quantize(Decimal("0.01"))
 
-        wmap = {}
-        if total_v > 0 and xi_by_asset:
-            for aid, xval in xi_by_asset.items():
-                wmap[asset_name[aid]] = (xval / total_v).quantize(Decimal("0.00000001"))
+def portfolio_snapshot_series(*, portfolio: Portfolio, start: date, end: date, as_iso_strings: bool = False) -> dict:
+    """
+    Igual que portfolio_time_series(use_trades=True) pero leído de PortfolioSnapshot (un range scan).
+    No escribe: si falta algún día del rango se devuelve la serie calculada en vivo.
+    Los pesos salen como float (tal cual se guardan en weights_json), con el nombre actual del activo.
+    Con as_iso_strings=True las fechas salen como 'YYYY-MM-DD' (formateadas en lote por NumPy).
+    """
+    rows = _snapshot_rows(portfolio, start, end)
+    if len(rows) < (end - start).days + 1:
+        data = portfolio_time_series(
+            portfolio=portfolio, start=start, end=end, use_trades=True, as_iso_strings=as_iso_strings,
+        )
+        data["weights"] = [{name: float(w) for name, w in wmap.items()} for wmap in data["weights"]]
+        return data
+
+    # Mismo orden de activos que el cálculo en vivo
+    names = [
+        (str(aid), name)
+        for aid, name in InitialWeight.objects.filter(portfolio=portfolio).values_list("asset_id", "asset__name")
+    ]
+    dates = [d for d, _, _ in rows]
+    if as_iso_strings:
+        dates = np.datetime_as_string(np.array(dates, dtype="datetime64[D]"), unit="D").tolist()
+    return {
+        "dates": dates,
+        "Vt": [v for _, v, _ in rows],
+        "weights": [{name: w[aid] for aid, name in names if aid in w} for _, _, w in rows],
+    }
 
-        dates.append(d)
-        vt.append(total_v)
-        weights.append(wmap)
 
-    return {"dates": dates, "Vt": vt, "weights": weights}
+LAST_PRICE_DATE_CACHE_KEY = "last_price_date"
+LAST_PRICE_DATE_CACHE_TIMEOUT = 60
 
 
 def last_price_date():
-    """Devuelve la última fecha disponible en Price o None si no hay datos."""
+    """
+    Devuelve la última fecha disponible en Price o None si no hay datos.
+    Cacheada (Django cache); las escrituras en Price borran la key (ver signals.py).
+    """
     from investments.models import Price  # import local para evitar ciclos
-    agg = Price.objects.aggregate(last=Max("date"))
-    return agg["last"]
\ No newline at end of file
+    return _cache_get_or_set(
+        LAST_PRICE_DATE_CACHE_KEY,
+        lambda: Price.objects.aggregate(last=Max("date"))["last"],
+        LAST_PRICE_DATE_CACHE_TIMEOUT,
+    )
\ No newline at end of file
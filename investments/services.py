@@ -1,11 +1,18 @@
 from __future__ import annotations
 
 from decimal import Decimal, ROUND_HALF_UP
-from datetime import datetime, date
+from functools import partial
+from datetime import date
 
-from django.db import models, transaction
+from django.db import connection, models, transaction
+from django.db.models import ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Value, Window
+from django.db.models.functions import Coalesce
 
-from investments.models import Portfolio, Asset, Price, HoldingAdjustment
+from investments.dates import ensure_date
+from investments.models import Portfolio, Asset, Price, InitialWeight, HoldingAdjustment, PortfolioSnapshot
+from investments.selectors import (
+    bump_price_matrix_version, iter_portfolio_time_series, _compute_initial_units_once, _dates,
+)
 import logging
 
 
@@ -13,80 +20,159 @@ import logging
 def _q(x) -> Decimal:
     return x if isinstance(x, Decimal) else Decimal(str(x))
 
-def _ensure_date(x) -> date:
-    if isinstance(x, date):
-        return x
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y"):
-        try:
-            return datetime.strptime(str(x), fmt).date()
-        except (TypeError, ValueError):
-            continue
-    raise ValueError(f"Fecha inválida: {x!r}")
-
-def _price(asset: Asset, d: date) -> Decimal:
-    return Price.objects.get(asset=asset, date=d).price
+def _prices_on(asset_ids: list[int], d: date) -> dict[int, Decimal]:
+    """{asset_id: precio en d} en una sola query (los activos sin precio ese día no aparecen)."""
+    return dict(Price.objects.filter(asset_id__in=asset_ids, date=d).values_list("asset_id", "price"))
 
+def _prices_or_previous_bulk(assets, d: date) -> dict[int, tuple[Decimal, date]]:
+    """{asset_id: (price, price_date)} with the most recent price <= d for every asset, in one query.
+    Assets with no price at or before d are left out.
+    """
+    qs = Price.objects.filter(asset_id__in=[a.id for a in assets], date__lte=d)
+    if connection.features.can_distinct_on_fields:
+        # PostgreSQL: DISTINCT ON (asset_id) ... ORDER BY asset_id, date DESC
+        qs = qs.order_by("asset_id", "-date").distinct("asset_id")
+    else:
+        latest = Subquery(
+            Price.objects.filter(asset=OuterRef("asset"), date__lte=d).order_by("-date").values("date")[:1]
+        )
+        qs = qs.filter(date=latest)
+    return {aid: (price, price_date) for aid, price_date, price in qs.values_list("asset_id", "date", "price")}
 
 def _price_or_previous(asset: Asset, d: date) -> tuple[Decimal, date]:
     """Return (price, price_date). If exact date not present, return the most recent price <= d.
     Raises Price.DoesNotExist if no price is available for the asset at or before d.
     """
-    p = Price.objects.filter(asset=asset, date__lte=d).order_by('-date').first()
-    if not p:
+    found = _prices_or_previous_bulk([asset], d).get(asset.id)
+    if found is None:
         raise Price.DoesNotExist(f"No price for asset {asset} on or before {d}")
-    return p.price, p.date
+    return found
 
 
 # ---------- core ----------
 def compute_initial_units_for_portfolio(*, portfolio: Portfolio) -> dict[int, Decimal]:
     """
-    Devuelve {asset_id: unidades_iniciales} usando C_{i,0} = w_i0 * V0 / P_i0.
+    Devuelve {asset_id: unidades_iniciales} usando C_{i,0} = w_i0 * V0 / P_i0 (sin cuantizar).
     Usamos asset_id como clave (no la instancia) para evitar mismatches.
+    Reutiliza el cálculo cacheado de los selectors (Django cache, invalidado por señales),
+    así que llamadas repetidas no vuelven a la DB. Lanza ValueError si faltan pesos o precios en t0.
     """
-    t0 = portfolio.initial_date
-    V0 = _q(portfolio.initial_value)
-    out: dict[int, Decimal] = {}
-    for iw in portfolio.initial_weights.select_related("asset"):
-        w = _q(iw.weight)
-        p = _price(iw.asset, t0)
-        units = (w * V0 / p).quantize(Decimal("0.00000001"), rounding=ROUND_HALF_UP)
-        out[iw.asset_id] = units
-    return out
+    base_units, _ = _compute_initial_units_once(portfolio)
+    return dict(base_units)
 
-def get_units_on_date(*, portfolio: Portfolio, asset: Asset, d) -> Decimal:
+def _price_on(d: date) -> Subquery:
+    """Subquery: precio del activo de la fila externa (OuterRef('asset')) en la fecha d."""
+    return Subquery(Price.objects.filter(asset=OuterRef("asset"), date=d).values("price")[:1])
+
+def _delta_until(portfolio: Portfolio, d: date) -> Subquery:
+    """Subquery: suma de delta_units del activo de la fila externa hasta d (incluida)."""
+    return Subquery(
+        HoldingAdjustment.objects
+        .filter(portfolio=portfolio, asset=OuterRef("asset"), effective_date__lte=d)
+        .values("asset")
+        .annotate(s=models.Sum("delta_units"))
+        .values("s")
+    )
+
+def get_units_on_date(*, portfolio: Portfolio, asset: Asset, d: date) -> Decimal:
     """
     Unidades = unidades_iniciales + sum(delta_units hasta d)
+    Peso inicial, precio en t0 y ajustes del activo salen en una sola query.
+    d debe ser un date ya parseado (ver investments.dates.ensure_date en el llamador).
     """
-    d = _ensure_date(d)
-    base_by_id = compute_initial_units_for_portfolio(portfolio=portfolio)
-    base = base_by_id.get(asset.id, Decimal("0"))
-    delta = (
-        HoldingAdjustment.objects
-        .filter(portfolio=portfolio, asset=asset, effective_date__lte=d)
-        .aggregate(total=models.Sum("delta_units"))["total"] or Decimal("0")
+    row = (
+        InitialWeight.objects
+        .filter(portfolio=portfolio, asset=asset)
+        .annotate(p0=_price_on(portfolio.initial_date), delta=_delta_until(portfolio, d))
+        .values_list("weight", "p0", "delta")
+        .first()
     )
-    return (base + _q(delta)).quantize(Decimal("0.00000001"), rounding=ROUND_HALF_UP)
-
-def portfolio_value_on_date(*, portfolio: Portfolio, d) -> Decimal:
-    d = _ensure_date(d)
-    total = Decimal("0")
-    for iw in portfolio.initial_weights.select_related("asset"):
-        c = get_units_on_date(portfolio=portfolio, asset=iw.asset, d=d)
-        p = _price(iw.asset, d)
-        total += c * p
-    return total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-def portfolio_weights_on_date(*, portfolio: Portfolio, d) -> dict[str, Decimal]:
-    d = _ensure_date(d)
-    Vt = portfolio_value_on_date(portfolio=portfolio, d=d)
+    if row is None:
+        # Activo sin peso inicial: solo cuentan los ajustes
+        base = Decimal("0")
+        delta = (
+            HoldingAdjustment.objects
+            .filter(portfolio=portfolio, asset=asset, effective_date__lte=d)
+            .aggregate(total=models.Sum("delta_units"))["total"]
+        )
+    else:
+        weight, p0, delta = row
+        if p0 is None:
+            raise Price.DoesNotExist(f"No price for asset {asset} on {portfolio.initial_date}")
+        base = _q(weight) * _q(portfolio.initial_value) / _q(p0)
+    # Se cuantiza una sola vez, sobre el resultado final
+    return (base + _q(delta or 0)).quantize(Decimal("0.00000001"), rounding=ROUND_HALF_UP)
+
+# value_i en SQL como NUMERIC (aritmética decimal exacta, p. ej. PostgreSQL), con holgura sobre los
+# campos de origen para no truncar productos/cocientes. SQLite no tiene NUMERIC exacto y Django envuelve
+# cada operación DecimalField en CAST(... AS NUMERIC), que convierte 1000.0 en el entero 1000 (división
+# entera con pesos/precios enteros): ahí se calcula en REAL, que es lo que SQLite haría de todos modos.
+_POSITION_VALUE_FIELD = models.DecimalField(max_digits=50, decimal_places=20)
+
+def _position_value(portfolio: Portfolio) -> ExpressionWrapper:
+    if connection.vendor == "sqlite":
+        v0, output_field = Value(float(portfolio.initial_value)), models.FloatField()
+    else:
+        v0 = Value(_q(portfolio.initial_value), output_field=_POSITION_VALUE_FIELD)
+        output_field = _POSITION_VALUE_FIELD
+    return ExpressionWrapper((F("weight") * v0 / F("p0") + F("delta")) * F("pd"), output_field=output_field)
+
+def _position_rows(portfolio: Portfolio, d: date):
+    """
+    Una fila por InitialWeight con: asset__name, p0, pd y value_i = C_{i,t} * P_{i,t},
+    donde C_{i,t} = w_i0 * V0 / P_i0 + sum(delta_units hasta d). Todo se calcula en SQL (ver _position_value).
+    """
+    return (
+        InitialWeight.objects
+        .filter(portfolio=portfolio)
+        .annotate(
+            p0=_price_on(portfolio.initial_date),
+            pd=_price_on(d),
+            delta=Coalesce(_delta_until(portfolio, d), Value(Decimal("0")), output_field=models.DecimalField()),
+        )
+        .annotate(value=_position_value(portfolio))
+    )
+
+def _value_and_weights(portfolio: Portfolio, d: date) -> tuple[Decimal, dict[str, Decimal]]:
+    """
+    Calcula (V_t, {asset_name: w_{i,t}}) para la fecha d en UNA query:
+    V_t sale de SUM(value_i) OVER () sobre las filas de _position_rows.
+    """
+    rows = list(
+        _position_rows(portfolio, d)
+        .annotate(vt=Window(models.Sum("value")))
+        .values_list("asset__name", "p0", "pd", "value", "vt")
+    )
+    for name, p0, pd, _, _ in rows:
+        if p0 is None:
+            raise Price.DoesNotExist(f"No price for asset {name} on {portfolio.initial_date}")
+        if pd is None:
+            raise Price.DoesNotExist(f"No price for asset {name} on {d}")
+
+    # Todo en Decimal; se cuantiza solo en la salida (los pesos con V_t sin redondear)
+    total = _q(rows[0][4] if rows else 0)
+    Vt = total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
     if Vt == 0:
-        return {}
-    res: dict[str, Decimal] = {}
-    for iw in portfolio.initial_weights.select_related("asset"):
-        c = get_units_on_date(portfolio=portfolio, asset=iw.asset, d=d)
-        p = _price(iw.asset, d)
-        res[iw.asset.name] = (c * p / Vt).quantize(Decimal("0.00000001"), rounding=ROUND_HALF_UP)
-    return res
+        return Vt, {}
+    weights = {
+        name: (_q(value) / total).quantize(Decimal("0.00000001"), rounding=ROUND_HALF_UP)
+        for name, _, _, value, _ in rows
+    }
+    return Vt, weights
+
+def portfolio_value_on_date(*, portfolio: Portfolio, d: date) -> Decimal:
+    """V_t = SUM(value_i) agregado en SQL (una query, sin traer filas por activo). d ya es un date."""
+    agg = _position_rows(portfolio, d).aggregate(
+        total=models.Sum("value"),
+        missing=models.Count("id", filter=Q(p0__isnull=True) | Q(pd__isnull=True)),
+    )
+    if agg["missing"]:
+        raise Price.DoesNotExist(f"Missing t0 ({portfolio.initial_date}) or {d} price for {agg['missing']} asset(s)")
+    return _q(agg["total"] or 0).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+def portfolio_weights_on_date(*, portfolio: Portfolio, d: date) -> dict[str, Decimal]:
+    _, weights = _value_and_weights(portfolio, d)
+    return weights
 
 @transaction.atomic
 def apply_trade(*, portfolio: Portfolio, d, asset_sell: Asset, value_sell, asset_buy: Asset, value_buy, fallback_to_previous_price: bool = True) -> None:
@@ -96,42 +182,44 @@ def apply_trade(*, portfolio: Portfolio, d, asset_sell: Asset, value_sell, asset
       - compra 'value_buy'  USD de asset_buy  -> delta_units POSITIVO
     Usa precios de ese día y cuantiza unidades a 8 decimales.
     """
-    d = _ensure_date(d)
-    # Intentamos precio en la fecha; si no existe y fallback_to_previous_price=True,
-    # usamos el precio más reciente anterior (esto facilita clonar/usar DB con rangos de fechas distintos).
-    try:
-        ps = _price(asset_sell, d)
-        ps_date = d
-    except Price.DoesNotExist:
-        if fallback_to_previous_price:
-            ps, ps_date = _price_or_previous(asset_sell, d)
-            logging.getLogger(__name__).warning("Price for %s on %s not found, using price from %s", asset_sell, d, ps_date)
-        else:
-            raise
-
-    try:
-        pb = _price(asset_buy, d)
-        pb_date = d
-    except Price.DoesNotExist:
-        if fallback_to_previous_price:
-            pb, pb_date = _price_or_previous(asset_buy, d)
-            logging.getLogger(__name__).warning("Price for %s on %s not found, using price from %s", asset_buy, d, pb_date)
-        else:
-            raise
+    d = ensure_date(d)
+    # Precios de ambos lados en una sola query. Si falta alguno y fallback_to_previous_price=True,
+    # usamos el precio más reciente anterior (esto facilita clonar/usar DB con rangos de fechas distintos),
+    # también en una sola query para todos los activos faltantes.
+    trade_prices = _prices_on([asset_sell.id, asset_buy.id], d)
+    missing = [a for a in (asset_sell, asset_buy) if a.id not in trade_prices]
+    if missing and not fallback_to_previous_price:
+        raise Price.DoesNotExist(f"No price for asset {missing[0]} on {d}")
+    if missing:
+        previous = _prices_or_previous_bulk(missing, d)
+        for asset in missing:
+            if asset.id not in previous:
+                raise Price.DoesNotExist(f"No price for asset {asset} on or before {d}")
+            price, price_date = previous[asset.id]
+            logging.getLogger(__name__).warning("Price for %s on %s not found, using price from %s", asset, d, price_date)
+            trade_prices[asset.id] = price
+    ps = trade_prices[asset_sell.id]
+    pb = trade_prices[asset_buy.id]
 
     units_sell = (_q(value_sell) / ps).quantize(Decimal("0.00000001"), rounding=ROUND_HALF_UP)
     units_buy = (_q(value_buy) / pb).quantize(Decimal("0.00000001"), rounding=ROUND_HALF_UP)
 
-    # Evita duplicados: si ya existe un ajuste idéntico no lo recreamos.
-    # Esto hace que la operación sea idempotente frente a reintentos/duplicados de la petición.
-    sell_kwargs = dict(portfolio=portfolio, asset=asset_sell, effective_date=d, delta_units=-units_sell)
-    buy_kwargs = dict(portfolio=portfolio, asset=asset_buy, effective_date=d, delta_units=units_buy)
-
-    if not HoldingAdjustment.objects.filter(**sell_kwargs).exists():
-        HoldingAdjustment.objects.create(**sell_kwargs)
-
-    if not HoldingAdjustment.objects.filter(**buy_kwargs).exists():
-        HoldingAdjustment.objects.create(**buy_kwargs)
+    # Evita duplicados: la UniqueConstraint 'uniq_hadj' + ignore_conflicts hace que un ajuste idéntico
+    # no se recree. Esto hace que la operación sea idempotente frente a reintentos/duplicados de la petición,
+    # en una sola query y sin la carrera exists()/create().
+    HoldingAdjustment.objects.bulk_create(
+        [
+            HoldingAdjustment(portfolio=portfolio, asset=asset_sell, effective_date=d, delta_units=-units_sell),
+            HoldingAdjustment(portfolio=portfolio, asset=asset_buy, effective_date=d, delta_units=units_buy),
+        ],
+        ignore_conflicts=True,
+    )
+    # bulk_create no dispara post_save: invalidamos la matriz cacheada y los snapshots desde d a mano.
+    # El bump va ya (lecturas dentro de esta transacción) y otra vez al commit (por si otro proceso
+    # reconstruyó la matriz con los datos previos mientras tanto).
+    bump_price_matrix_version(portfolio_ids=[portfolio.id])
+    transaction.on_commit(partial(bump_price_matrix_version, portfolio_ids=[portfolio.id]))
+    invalidate_portfolio_snapshots(portfolio_id=portfolio.id, from_date=d)
 
     # Retornamos las unidades calculadas por si el llamador quiere usarlas (útil para tests/manual checks)
     return {'units_sell': units_sell, 'units_buy': units_buy}
@@ -150,10 +238,11 @@ def ensure_demo_trade_applied(*, portfolio: Portfolio) -> bool:
     if HoldingAdjustment.objects.filter(portfolio=portfolio).exists():
         return True
 
-    try:
-        asset_sell = Asset.objects.get(name='EEUU')
-        asset_buy = Asset.objects.get(name='Europa')
-    except Asset.DoesNotExist:
+    # Ambos assets en una sola query
+    assets = Asset.objects.in_bulk(['EEUU', 'Europa'], field_name='name')
+    asset_sell = assets.get('EEUU')
+    asset_buy = assets.get('Europa')
+    if asset_sell is None or asset_buy is None:
         logger.info("Demo assets not present in DB; skipping demo trade application.")
         return False
 
@@ -168,3 +257,75 @@ def ensure_demo_trade_applied(*, portfolio: Portfolio) -> bool:
     except Exception:
         logger.exception("Unexpected error applying demo trade")
         return False
+
+
+# ---------- Snapshots materializados (PortfolioSnapshot) ----------
+# Las escrituras borran los días afectados y, al commit, se recalculan solo esos días (ver signals.py;
+# los caminos con bulk_create llaman a invalidate_portfolio_snapshots). Las lecturas nunca escriben.
+
+def refresh_portfolio_snapshots(*, portfolio: Portfolio, end: date | None = None) -> int:
+    """
+    Crea los snapshots que falten entre t0 y end (por defecto, la última fecha de precios).
+    Solo se calcula el sub-rango [primer día faltante, último día faltante], sin las caches
+    (lo que se guarda no caduca): unidades y matriz se leen de la DB.
+    Devuelve la cantidad de días creados. Lanza ValueError si el portafolio no tiene datos en t0.
+    """
+    if end is None:
+        end = Price.objects.aggregate(last=Max("date"))["last"]
+    t0 = portfolio.initial_date
+    if end is None or end < t0:
+        return 0
+
+    existing = set(
+        PortfolioSnapshot.objects.filter(portfolio=portfolio, date__range=(t0, end)).values_list("date", flat=True)
+    )
+    missing = [d for d in _dates(t0, end) if d not in existing]
+    if not missing:
+        return 0
+
+    rows = iter_portfolio_time_series(
+        portfolio=portfolio, start=missing[0], end=missing[-1], use_trades=True, use_cache=False,
+        weights_by_asset_id=True,
+    )
+    missing = set(missing)
+    PortfolioSnapshot.objects.bulk_create(
+        [
+            PortfolioSnapshot(
+                portfolio=portfolio, date=d, value=v,
+                weights_json={str(aid): float(w) for aid, w in wmap.items()},
+            )
+            for d, v, wmap in rows if d in missing
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    return len(missing)
+
+
+def _refresh_snapshots_on_commit(portfolio_id=None) -> None:
+    portfolios = Portfolio.objects.all()
+    if portfolio_id is not None:
+        portfolios = portfolios.filter(pk=portfolio_id)
+    for p in portfolios:
+        try:
+            refresh_portfolio_snapshots(portfolio=p)
+        except ValueError as e:
+            # Sin pesos/precios en t0 todavía: los gráficos calculan en vivo hasta que haya datos
+            logging.getLogger(__name__).warning("Snapshots de '%s' sin recalcular: %s", p, e)
+
+
+def invalidate_portfolio_snapshots(*, portfolio_id=None, from_date=None, on_date=None, refresh: bool = True) -> None:
+    """
+    Borra snapshots: de un portafolio (o todos), desde from_date o solo en on_date.
+    Con refresh=True los días borrados se recalculan al commit (en autocommit, enseguida).
+    """
+    qs = PortfolioSnapshot.objects.all()
+    if portfolio_id is not None:
+        qs = qs.filter(portfolio_id=portfolio_id)
+    if from_date is not None:
+        qs = qs.filter(date__gte=from_date)
+    if on_date is not None:
+        qs = qs.filter(date=on_date)
+    qs.delete()
+    if refresh:
+        transaction.on_commit(partial(_refresh_snapshots_on_commit, portfolio_id))
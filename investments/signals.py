@@ -0,0 +1,105 @@
+# investments/signals.py
+from __future__ import annotations
+
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from investments.models import Asset, Portfolio, Price, InitialWeight, HoldingAdjustment
+from investments.selectors import initial_units_cache_key, bump_price_matrix_version, LAST_PRICE_DATE_CACHE_KEY
+from investments.services import invalidate_portfolio_snapshots
+
+
+# ---------- Invalidación de unidades iniciales cacheadas ----------
+
+@receiver(post_save, sender=Portfolio)
+@receiver(post_delete, sender=Portfolio)
+def _invalidate_initial_units_portfolio(sender, instance, **kwargs):
+    cache.delete(initial_units_cache_key(instance.id, instance.initial_date))
+
+
+@receiver(post_save, sender=InitialWeight)
+@receiver(post_delete, sender=InitialWeight)
+def _invalidate_initial_units_weight(sender, instance, **kwargs):
+    t0 = Portfolio.objects.filter(pk=instance.portfolio_id).values_list("initial_date", flat=True).first()
+    if t0 is not None:
+        cache.delete(initial_units_cache_key(instance.portfolio_id, t0))
+
+
+@receiver(post_save, sender=Asset)
+def _invalidate_initial_units_asset(sender, instance, created, **kwargs):
+    # La cache también guarda los nombres (asset_id -> nombre): un rename la deja vieja
+    if not created:
+        rows = Portfolio.objects.filter(initial_weights__asset_id=instance.id).values_list("id", "initial_date")
+        cache.delete_many([initial_units_cache_key(pid, t0) for pid, t0 in rows])
+
+
+@receiver(post_save, sender=Price)
+@receiver(post_delete, sender=Price)
+def _invalidate_initial_units_price(sender, instance, **kwargs):
+    # Solo afecta a los portafolios cuyo t0 coincide con la fecha del precio
+    pids = Portfolio.objects.filter(initial_date=instance.date).values_list("id", flat=True)
+    cache.delete_many([initial_units_cache_key(pid, instance.date) for pid in pids])
+
+
+# ---------- Invalidación de la matriz de precios/ajustes ----------
+# Ojo: bulk_create/update no disparan señales; esos caminos llaman a bump_price_matrix_version() directamente.
+
+# Se invalida ya (lecturas en la misma transacción) y al commit (matrices reconstruidas por otro
+# proceso con los datos previos); solo las matrices que incluyen ese activo / portafolio.
+
+@receiver(post_save, sender=Price)
+@receiver(post_delete, sender=Price)
+def _invalidate_price_matrix_price(sender, instance, **kwargs):
+    bump_price_matrix_version(asset_ids=[instance.asset_id])
+    transaction.on_commit(partial(bump_price_matrix_version, asset_ids=[instance.asset_id]))
+
+
+@receiver(post_save, sender=HoldingAdjustment)
+@receiver(post_delete, sender=HoldingAdjustment)
+def _invalidate_price_matrix_adjustment(sender, instance, **kwargs):
+    bump_price_matrix_version(portfolio_ids=[instance.portfolio_id])
+    transaction.on_commit(partial(bump_price_matrix_version, portfolio_ids=[instance.portfolio_id]))
+
+
+# ---------- Invalidación de la última fecha de precios ----------
+
+@receiver(post_save, sender=Price)
+@receiver(post_delete, sender=Price)
+def _invalidate_last_price_date(sender, instance, **kwargs):
+    cache.delete(LAST_PRICE_DATE_CACHE_KEY)
+
+
+# ---------- Invalidación de snapshots materializados ----------
+# Solo se borran los días afectados; se recalculan al commit (services.refresh_portfolio_snapshots).
+# weights_json va por asset_id, así que renombrar un Asset no los invalida.
+
+@receiver(post_save, sender=Portfolio)
+def _invalidate_snapshots_portfolio(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_portfolio_snapshots(portfolio_id=instance.id)
+
+
+@receiver(post_save, sender=InitialWeight)
+@receiver(post_delete, sender=InitialWeight)
+def _invalidate_snapshots_weight(sender, instance, **kwargs):
+    invalidate_portfolio_snapshots(portfolio_id=instance.portfolio_id)
+
+
+@receiver(post_save, sender=Price)
+@receiver(post_delete, sender=Price)
+def _invalidate_snapshots_price(sender, instance, **kwargs):
+    # Un precio solo afecta a su día... salvo en el t0 de un portafolio (cambian C_{i,0})
+    invalidate_portfolio_snapshots(on_date=instance.date)
+    for pid in Portfolio.objects.filter(initial_date=instance.date).values_list("id", flat=True):
+        invalidate_portfolio_snapshots(portfolio_id=pid)
+
+
+@receiver(post_save, sender=HoldingAdjustment)
+@receiver(post_delete, sender=HoldingAdjustment)
+def _invalidate_snapshots_adjustment(sender, instance, **kwargs):
+    # Los ajustes se acumulan: afectan desde effective_date en adelante
+    invalidate_portfolio_snapshots(portfolio_id=instance.portfolio_id, from_date=instance.effective_date)
@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+
+from investments.models import Asset, Portfolio, Price, InitialWeight, HoldingAdjustment
+from investments.services import apply_trade
+
+# Cache por proceso en los tests: no tocar la cache de archivos del server de desarrollo
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+T0 = date(2022, 1, 3)
+DAYS = 12
+END = T0 + timedelta(days=DAYS - 1)
+MID = T0 + timedelta(days=5)
+
+
+def create_portfolio_data(cls):
+    """3 activos, un portafolio con t0=T0 y precios diarios (con decimales "feos") de T0 a END."""
+    cls.a, cls.b, cls.c = (Asset.objects.create(name=n) for n in ('A', 'B', 'C'))
+    cls.p = Portfolio.objects.create(name='P', initial_value=Decimal('1000000000'), initial_date=T0)
+    for asset, w in ((cls.a, '0.5'), (cls.b, '0.3'), (cls.c, '0.2')):
+        InitialWeight.objects.create(portfolio=cls.p, asset=asset, weight=Decimal(w))
+    bases = {cls.a: Decimal('100.12345678'), cls.b: Decimal('57.31415926'), cls.c: Decimal('1234.56789012')}
+    Price.objects.bulk_create([
+        Price(asset=asset, date=T0 + timedelta(days=k),
+              price=(base * (1 + Decimal(k) * Decimal('0.0137') * (-1) ** k)).quantize(Decimal('0.00000001')))
+        for asset, base in bases.items() for k in range(DAYS)
+    ])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PortfolioDataTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_portfolio_data(cls)
+
+    def setUp(self):
+        cache.clear()
+
+    def trade(self, d=MID, value=Decimal('123456789.123')):
+        return apply_trade(portfolio=self.p, d=d, asset_sell=self.a, value_sell=value, asset_buy=self.c, value_buy=value)
+
+
+def decimal_reference(portfolio, d, use_trades=True):
+    """V_t y w_{i,t} calculados íntegramente en Decimal (la implementación original, sin float)."""
+    values = {}
+    for iw in InitialWeight.objects.filter(portfolio=portfolio).select_related('asset'):
+        p0 = Price.objects.get(asset=iw.asset, date=portfolio.initial_date).price
+        pt = Price.objects.get(asset=iw.asset, date=d).price
+        delta = Decimal('0')
+        if use_trades:
+            delta = (
+                HoldingAdjustment.objects.filter(portfolio=portfolio, asset=iw.asset, effective_date__lte=d)
+                .aggregate(s=Sum('delta_units'))['s'] or Decimal('0')
+            )
+        values[iw.asset.name] = (iw.weight * portfolio.initial_value / p0 + delta) * pt
+    vt = sum(values.values())
+    return vt, {name: v / vt for name, v in values.items()}
+
+
+class ReferenceAssertions:
+    def assert_matches_reference(self, d, vt, weights, use_trades=True):
+        ref_vt, ref_w = decimal_reference(self.p, d, use_trades=use_trades)
+        # V_t sale redondeado a centavos: medio centavo más 1e-8 relativo del lado float
+        self.assertLessEqual(abs(vt - ref_vt), Decimal('0.005') + ref_vt * Decimal('1e-8'), d)
+        self.assertEqual(set(weights), set(ref_w))
+        for name, w in weights.items():
+            self.assertLessEqual(abs(Decimal(w) - ref_w[name]), Decimal('1e-8'), (d, name))
@@ -0,0 +1,67 @@
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from investments.models import HoldingAdjustment
+
+from .base import END, MID, T0, PortfolioDataTestCase
+
+
+class TradeApiTests(PortfolioDataTestCase):
+    def url(self):
+        return f'/api/portfolios/{self.p.id}/trade'
+
+    def payload(self, **kwargs):
+        data = {'fecha': MID.isoformat(), 'asset_sell': 'A', 'asset_buy': 'C',
+                'value_sell': '1000', 'value_buy': '1000'}
+        data.update(kwargs)
+        return data
+
+    def test_trade_by_asset_name(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(self.url(), self.payload(), content_type='application/json')
+        self.assertEqual(resp.status_code, 200, resp.content)
+        # un solo in_bulk para los 2 activos, en vez de un get por activo
+        asset_lookups = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'FROM "investments_asset"' in q['sql']]
+        self.assertEqual(len(asset_lookups), 1, asset_lookups)
+        self.assertEqual(
+            dict(HoldingAdjustment.objects.filter(portfolio=self.p).values_list('asset__name', 'effective_date')),
+            {'A': MID, 'C': MID},
+        )
+
+    def test_unknown_assets_return_400(self):
+        resp = self.client.post(self.url(), self.payload(asset_sell='X', asset_buy='Y'), content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json(), {'detail': "Activos no encontrados: ['X', 'Y']"})
+
+        resp = self.client.post(self.url(), self.payload(asset_buy='Y'), content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("['Y']", resp.json()['detail'])
+        self.assertFalse(HoldingAdjustment.objects.exists())
+
+
+class TimeSeriesStreamTests(PortfolioDataTestCase):
+    def get(self, **params):
+        params = {'fecha_inicio': T0.isoformat(), 'fecha_fin': END.isoformat(), **params}
+        return self.client.get(f'/api/portfolios/{self.p.id}/time-series', params)
+
+    def test_ndjson_matches_json_response(self):
+        self.trade()
+        for use_trades in ('1', '0'):
+            data = self.get(use_trades=use_trades).json()
+            resp = self.get(use_trades=use_trades, stream='1')
+            self.assertEqual(resp.status_code, 200)
+            self.assertTrue(resp.streaming)
+            self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+
+            body = b''.join(resp.streaming_content).decode()
+            self.assertTrue(body.endswith('\n'))
+            lines = [json.loads(line) for line in body.splitlines()]
+            self.assertEqual([line['date'] for line in lines], data['dates'])
+            self.assertEqual([line['Vt'] for line in lines], data['Vt'])
+            self.assertEqual([line['weights'] for line in lines], data['weights'])
+
+    def test_stream_validates_fecha_fin(self):
+        resp = self.get(fecha_fin='2099-01-01', stream='1')
+        self.assertEqual(resp.status_code, 400)
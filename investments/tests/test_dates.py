@@ -0,0 +1,18 @@
+from datetime import date
+
+from django.test import SimpleTestCase
+
+from investments.dates import ensure_date
+
+
+class EnsureDateTests(SimpleTestCase):
+    def test_accepted_formats(self):
+        for s in ('2022-02-15', '15-02-2022', '15/02/2022', '2022-2-15', '15/2/2022'):
+            self.assertEqual(ensure_date(s), date(2022, 2, 15), s)
+        self.assertEqual(ensure_date(date(2022, 2, 15)), date(2022, 2, 15))
+
+    def test_rejected_inputs(self):
+        for s in ('2022-02-30', '15-02/2022', '2022/02/15', '2022-02-15\n', ' 2022-02-15',
+                  '١٥/٠٢/٢٠٢٢', '15.02.2022', '', None):
+            with self.assertRaises(ValueError, msg=repr(s)):
+                ensure_date(s)
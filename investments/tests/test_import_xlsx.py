@@ -0,0 +1,136 @@
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import pandas as pd
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from investments.management.commands.import_xlsx import _to_decimal, _to_decimal_series
+from investments.models import Asset, InitialWeight, Price
+
+from .base import LOCMEM_CACHES
+
+
+class ToDecimalSeriesTests(SimpleTestCase):
+    CELLS = ['5%', '5', '0,25', 0.25, '100', '150', ' 12,5 % ', 1.5, '0', 101, '1']
+
+    def test_matches_cell_by_cell(self):
+        for pct in (True, False):
+            vals = _to_decimal_series(pd.Series(self.CELLS, dtype=object), treat_percent_as_fraction=pct)
+            expected = [_to_decimal(c, treat_percent_as_fraction=pct) for c in self.CELLS]
+            self.assertEqual(vals, expected, pct)
+            self.assertTrue(all(isinstance(v, Decimal) for v in vals))
+
+    def test_keeps_all_digits(self):
+        # Más dígitos de los que float64 representa (max_digits=20 en Price/InitialWeight)
+        cells = ['123456789012.12345678', '12,3456789012345678%', '0.12345678901234567891']
+        vals = _to_decimal_series(pd.Series(cells, dtype=object))
+        self.assertEqual(vals, [
+            Decimal('123456789012.12345678'), Decimal('0.123456789012345678'), Decimal('0.12345678901234567891'),
+        ])
+        self.assertEqual(vals, [_to_decimal(c) for c in cells])
+
+    def test_invalid_cells_raise(self):
+        for bad in ('', 'abc', None, float('nan'), 'nan'):
+            with self.assertRaises(CommandError):
+                _to_decimal(bad)
+            with self.assertRaises(CommandError):
+                _to_decimal_series(pd.Series(['1', bad], dtype=object))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImportXlsxCommandTests(TestCase):
+    """Corre el comando completo sobre un xlsx generado con el layout de datos.xlsx."""
+
+    T0 = '03-01-2022'
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'datos.xlsx')
+
+    def write_xlsx(self, weights_rows, prices):
+        weights = pd.DataFrame(weights_rows, columns=['Fecha', 'Activos', 'Portafolio 1', 'Portafolio 2'])
+        with pd.ExcelWriter(self.path) as w:
+            weights.to_excel(w, sheet_name='weights', index=False)
+            pd.DataFrame(prices).to_excel(w, sheet_name='Precios', index=False)
+
+    def run_import(self):
+        out = StringIO()
+        call_command('import_xlsx', self.path, initial_date=self.T0, stdout=out)
+        return out.getvalue()
+
+    def test_weights_bulk_with_duplicates_and_existing_assets(self):
+        Asset.objects.create(name='A')
+        self.write_xlsx(
+            [
+                [self.T0, 'A', '10%', '0,5'],
+                [self.T0, ' B ', 0.9, 0.5],
+                [self.T0, 'A', '0.1', '50'],  # repetido: gana la última fila
+                ['04-01-2022', 'C', 1, 1],    # otra fecha: se ignora
+            ],
+            {'Dates': [self.T0], 'A': ['1'], 'B': ['2']},
+        )
+        out = self.run_import()
+
+        self.assertIn('(filas: 2)', out)
+        self.assertEqual(sorted(Asset.objects.values_list('name', flat=True)), ['A', 'B'])
+        weights = {
+            (w.portfolio.name, w.asset.name): w.weight
+            for w in InitialWeight.objects.select_related('portfolio', 'asset')
+        }
+        self.assertEqual(weights, {
+            ('Portafolio 1', 'A'): Decimal('0.1'), ('Portafolio 2', 'A'): Decimal('0.5'),
+            ('Portafolio 1', 'B'): Decimal('0.9'), ('Portafolio 2', 'B'): Decimal('0.5'),
+        })
+
+        # re-import: upsert de los pesos, sin duplicar filas
+        self.write_xlsx(
+            [[self.T0, 'A', '0.3', '0.2'], [self.T0, 'B', '0.7', '0.8']],
+            {'Dates': [self.T0], 'A': ['1'], 'B': ['2']},
+        )
+        self.run_import()
+        self.assertEqual(InitialWeight.objects.count(), 4)
+        self.assertEqual(
+            InitialWeight.objects.get(portfolio__name='Portafolio 2', asset__name='B').weight, Decimal('0.8')
+        )
+
+    def test_prices_inserted_in_chunks_with_exact_values(self):
+        dates = ['03-01-2022', '04-01-2022', '05-01-2022', '06-01-2022']
+        self.write_xlsx(
+            [[self.T0, 'A', '0.5', '0.5'], [self.T0, 'B', '0.5', '0.5']],
+            {
+                'Dates': dates,
+                'A': ['1234.12345678', '1', '2,5', '3'],
+                'B': [10, 11.25, '12', '13'],
+                'Extra': [0, 0, 0, 0],  # no está en weights: se ignora
+            },
+        )
+        with mock.patch('investments.management.commands.import_xlsx.PRICE_BATCH_SIZE', 3), \
+                mock.patch.object(Price.objects, 'bulk_create', wraps=Price.objects.bulk_create) as bulk:
+            self.run_import()
+        self.assertEqual([len(c.args[0]) for c in bulk.call_args_list], [3, 3, 2])
+
+        prices = {(p.asset.name, p.date): p.price for p in Price.objects.select_related('asset')}
+        self.assertEqual(len(prices), 8)
+        # SQLite devuelve DecimalField con 15 dígitos significativos; el caso de 20 está en ToDecimalSeriesTests
+        self.assertEqual(prices[('A', date(2022, 1, 3))], Decimal('1234.12345678'))
+        self.assertEqual(prices[('A', date(2022, 1, 5))], Decimal('2.5'))
+        self.assertEqual(prices[('B', date(2022, 1, 4))], Decimal('11.25'))
+
+        # re-import: ignore_conflicts, sin duplicar
+        self.run_import()
+        self.assertEqual(Price.objects.count(), 8)
+
+    def test_missing_price_column_raises(self):
+        self.write_xlsx(
+            [[self.T0, 'A', '0.5', '0.5'], [self.T0, 'B', '0.5', '0.5']],
+            {'Dates': [self.T0], 'A': ['1']},
+        )
+        with self.assertRaisesMessage(CommandError, "Faltan columnas de precios"):
+            self.run_import()
@@ -0,0 +1,52 @@
+from unittest import mock, skipUnless
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from investments import selectors
+from investments.selectors import (
+    HAS_NUMBA, _compute_series_kernel, _compute_series_kernel_numba, _compute_series_kernel_numba_py,
+    portfolio_time_series,
+)
+
+from .base import END, T0, PortfolioDataTestCase
+
+
+class SeriesKernelParityTests(SimpleTestCase):
+    """El kernel en loop (el que compila Numba) da lo mismo que el de NumPy, con y sin trades."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        T, N = 40, 7
+        self.prices = rng.uniform(1, 2000, (T, N))
+        self.prices[rng.random((T, N)) < 0.15] = np.nan  # días sin precio
+        self.has_price = ~np.isnan(self.prices)
+        self.base_vec = rng.uniform(1e3, 1e7, N)
+        self.adj = np.cumsum(rng.normal(0, 1e3, (T, N)) * (rng.random((T, N)) < 0.1), axis=0)
+
+    def assert_parity(self, kernel):
+        for adj in (None, self.adj):
+            units = self.base_vec[None, :] + adj if adj is not None else np.broadcast_to(self.base_vec, self.prices.shape)
+            vt, value = kernel(self.prices, np.ascontiguousarray(units))
+            ref_vt, ref_value = _compute_series_kernel(self.prices, self.has_price, self.base_vec, adj)
+            np.testing.assert_allclose(vt, ref_vt, rtol=1e-12)
+            np.testing.assert_allclose(value, ref_value, rtol=1e-12)  # NaN en las mismas celdas
+
+    def test_python_loop(self):
+        self.assert_parity(_compute_series_kernel_numba_py)
+
+    @skipUnless(HAS_NUMBA, 'numba no instalado')
+    def test_compiled(self):
+        self.assert_parity(_compute_series_kernel_numba)
+
+
+class NumbaFlagTests(PortfolioDataTestCase):
+    def test_series_with_flag_matches_numpy(self):
+        self.trade()
+        for use_trades in (True, False):
+            expected = portfolio_time_series(portfolio=self.p, start=T0, end=END, use_trades=use_trades)
+            # sin numba instalado, el flag corre el kernel en loop (mismo código que se compila)
+            with override_settings(INVESTMENTS_USE_NUMBA=True), mock.patch.object(selectors, 'HAS_NUMBA', True):
+                self.assertTrue(selectors._numba_enabled())
+                got = portfolio_time_series(portfolio=self.p, start=T0, end=END, use_trades=use_trades)
+            self.assertEqual(got, expected)
@@ -0,0 +1,92 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from investments.models import Asset, Portfolio, Price, InitialWeight, HoldingAdjustment
+from investments.services import apply_trade
+from investments.selectors import _build_price_matrix, _price_matrix, _price_matrix_key, portfolio_time_series
+
+from .base import END, LOCMEM_CACHES, MID, T0, create_portfolio_data
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PriceMatrixCacheTests(TransactionTestCase):
+    """
+    Matriz cacheada por portafolio: versionada por portafolio (HoldingAdjustment) y por activo (Price).
+    TransactionTestCase porque dentro de una transacción abierta no se escribe en la cache.
+    """
+
+    def setUp(self):
+        cache.clear()
+        create_portfolio_data(self)
+        # Q comparte el activo A con P y además tiene D
+        self.d = Asset.objects.create(name='D')
+        self.q = Portfolio.objects.create(name='Q', initial_value=Decimal('1000'), initial_date=T0)
+        InitialWeight.objects.create(portfolio=self.q, asset=self.a, weight=Decimal('0.4'))
+        InitialWeight.objects.create(portfolio=self.q, asset=self.d, weight=Decimal('0.6'))
+        Price.objects.bulk_create([Price(asset=self.d, date=p.date, price=p.price * 3)
+                                   for p in Price.objects.filter(asset=self.a)])
+
+    def series(self, portfolio, start=T0, end=END, **kwargs):
+        return portfolio_time_series(portfolio=portfolio, start=start, end=end, **kwargs)
+
+    def assert_cached(self, portfolio):
+        with self.assertNumQueries(0):
+            self.series(portfolio)
+
+    def assert_rebuilt_and_fresh(self, portfolio):
+        with self.assertNumQueries(3):  # bounds + precios + ajustes
+            data = self.series(portfolio)
+        self.assertEqual(data, self.series(portfolio, use_cache=False))
+
+    def warm(self):
+        self.series(self.p)
+        self.series(self.q)
+        self.assert_cached(self.p)
+        self.assert_cached(self.q)
+
+    def test_price_write_invalidates_only_matrices_with_that_asset(self):
+        self.warm()
+        price = Price.objects.get(asset=self.d, date=MID)
+        price.price *= 2
+        price.save()
+        self.assert_cached(self.p)
+        self.assert_rebuilt_and_fresh(self.q)
+
+        price = Price.objects.get(asset=self.a, date=MID)
+        price.price *= 2
+        price.save()
+        self.assert_rebuilt_and_fresh(self.p)
+        self.assert_rebuilt_and_fresh(self.q)
+
+    def test_adjustment_write_invalidates_only_its_portfolio(self):
+        self.warm()
+        HoldingAdjustment.objects.create(portfolio=self.p, asset=self.a, effective_date=MID, delta_units=Decimal('-5'))
+        self.assert_cached(self.q)
+        self.assert_rebuilt_and_fresh(self.p)
+
+    def test_trade_invalidates_its_portfolio(self):
+        self.warm()
+        key_p, key_q = _price_matrix_key(self.p, [self.a.id, self.b.id, self.c.id]), _price_matrix_key(self.q, [self.a.id, self.d.id])
+        apply_trade(portfolio=self.p, d=MID, asset_sell=self.a, value_sell=Decimal('1000'),
+                    asset_buy=self.c, value_buy=Decimal('1000'))
+        self.assertNotEqual(_price_matrix_key(self.p, [self.a.id, self.b.id, self.c.id]), key_p)
+        self.assertEqual(_price_matrix_key(self.q, [self.a.id, self.d.id]), key_q)
+        self.assert_cached(self.q)
+        self.assert_rebuilt_and_fresh(self.p)
+
+    def test_window_from_t0_and_extended_on_demand(self):
+        ids = [self.a.id, self.b.id, self.c.id]
+        self.assertEqual(_price_matrix(self.p, ids, MID, MID)['span'], (T0, MID))
+        data = self.series(self.p, MID, END)
+        self.assertEqual(data, self.series(self.p, MID, END, use_cache=False))
+        self.assertEqual(_price_matrix(self.p, ids, MID, END)['span'], (T0, END))
+        with self.assertNumQueries(0):
+            self.series(self.p, T0, MID)
+
+    def test_uncached_build_loads_only_the_window(self):
+        mat = _build_price_matrix(self.p, [self.a.id], MID, date(2099, 1, 1))
+        self.assertEqual(str(mat['grid'][0]), MID.isoformat())
+        self.assertEqual(str(mat['grid'][-1]), END.isoformat())
@@ -0,0 +1,37 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from investments.models import Price
+from investments.selectors import last_price_date
+
+from .base import END, LOCMEM_CACHES, create_portfolio_data
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LastPriceDateTests(TransactionTestCase):
+    """Cacheada fuera de transacción; post_save/post_delete de Price borran la key."""
+
+    def setUp(self):
+        cache.clear()
+        create_portfolio_data(self)
+
+    def assert_cached(self, expected):
+        with self.assertNumQueries(0):
+            self.assertEqual(last_price_date(), expected)
+
+    def test_cached_and_cleared_on_price_writes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(last_price_date(), END)
+        self.assert_cached(END)
+
+        later = END + timedelta(days=3)
+        price = Price.objects.create(asset=self.a, date=later, price=Decimal('1'))
+        self.assertEqual(last_price_date(), later)
+        self.assert_cached(later)
+
+        price.delete()
+        self.assertEqual(last_price_date(), END)
+        self.assert_cached(END)
@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from investments.models import Asset, Portfolio, Price, InitialWeight
+from investments.services import (
+    _price_or_previous, _prices_or_previous_bulk, portfolio_value_on_date, portfolio_weights_on_date,
+)
+
+from .base import END, MID, T0, PortfolioDataTestCase, ReferenceAssertions
+
+
+class ValueAndWeightsOnDateTests(ReferenceAssertions, PortfolioDataTestCase):
+    """V_t y pesos agregados en SQL (_position_rows) contra el cálculo en Decimal."""
+
+    def assert_on_date_matches_reference(self, d):
+        self.assert_matches_reference(
+            d, portfolio_value_on_date(portfolio=self.p, d=d), portfolio_weights_on_date(portfolio=self.p, d=d)
+        )
+
+    def test_matches_decimal_path(self):
+        self.trade()
+        for d in (T0, MID - timedelta(days=1), MID, END):
+            self.assert_on_date_matches_reference(d)
+
+    def test_integral_weights_and_prices(self):
+        # Peso 1 y precios enteros: ninguna división puede volverse entera en la DB
+        self.p = Portfolio.objects.create(name='Z', initial_value=Decimal('1000'), initial_date=date(2030, 1, 1))
+        z1, z2 = Asset.objects.create(name='Z1'), Asset.objects.create(name='Z2')
+        InitialWeight.objects.create(portfolio=self.p, asset=z1, weight=Decimal('1'))
+        InitialWeight.objects.create(portfolio=self.p, asset=z2, weight=Decimal('0'))
+        for asset in (z1, z2):
+            Price.objects.create(asset=asset, date=date(2030, 1, 1), price=Decimal('3'))
+            Price.objects.create(asset=asset, date=date(2030, 1, 2), price=Decimal('7'))
+
+        self.assertEqual(portfolio_value_on_date(portfolio=self.p, d=date(2030, 1, 2)), Decimal('2333.33'))
+        self.assertEqual(
+            portfolio_weights_on_date(portfolio=self.p, d=date(2030, 1, 2)),
+            {'Z1': Decimal('1.00000000'), 'Z2': Decimal('0E-8')},
+        )
+        self.assert_on_date_matches_reference(date(2030, 1, 2))
+
+    def test_missing_price_raises(self):
+        Price.objects.filter(asset=self.b, date=MID).delete()
+        with self.assertRaises(Price.DoesNotExist):
+            portfolio_value_on_date(portfolio=self.p, d=MID)
+        with self.assertRaises(Price.DoesNotExist):
+            portfolio_weights_on_date(portfolio=self.p, d=MID)
+
+
+class PricesOrPreviousTests(PortfolioDataTestCase):
+    """Precio más reciente <= d para varios activos en una sola query."""
+
+    def test_most_recent_on_or_before(self):
+        Price.objects.filter(asset=self.a, date__in=[MID, MID - timedelta(days=1)]).delete()
+        late = Asset.objects.create(name='L')  # solo tiene precio después de MID
+        Price.objects.create(asset=late, date=END, price=Decimal('5'))
+        prices = {(p.asset_id, p.date): p.price for p in Price.objects.all()}
+
+        with self.assertNumQueries(1):
+            found = _prices_or_previous_bulk([self.a, self.b, self.c, late], MID)
+        prev = MID - timedelta(days=2)
+        self.assertEqual(found, {
+            self.a.id: (prices[(self.a.id, prev)], prev),
+            self.b.id: (prices[(self.b.id, MID)], MID),
+            self.c.id: (prices[(self.c.id, MID)], MID),
+        })
+        self.assertEqual(_prices_or_previous_bulk([late], END), {late.id: (Decimal('5'), END)})
+
+    def test_single_asset_raises_without_price(self):
+        self.assertEqual(_price_or_previous(self.b, END + timedelta(days=30))[1], END)
+        with self.assertRaises(Price.DoesNotExist):
+            _price_or_previous(self.b, T0 - timedelta(days=1))
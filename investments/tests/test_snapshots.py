@@ -0,0 +1,133 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from investments import services
+from investments.models import Asset, PortfolioSnapshot, Price
+from investments.selectors import portfolio_snapshot_series, portfolio_time_series
+from investments.services import refresh_portfolio_snapshots
+
+from .base import DAYS, END, LOCMEM_CACHES, MID, T0, PortfolioDataTestCase, create_portfolio_data
+
+
+class SnapshotTests(PortfolioDataTestCase):
+    """Lecturas sin escrituras; invalidación por día y recálculo al commit solo de lo que falta."""
+
+    def snapshot_dates(self):
+        return list(PortfolioSnapshot.objects.filter(portfolio=self.p).order_by('date').values_list('date', flat=True))
+
+    def assert_snapshots_match_live(self):
+        self.assertEqual(len(self.snapshot_dates()), DAYS)
+        snap = portfolio_snapshot_series(portfolio=self.p, start=T0, end=END)
+        live = portfolio_time_series(portfolio=self.p, start=T0, end=END, use_cache=False)
+        self.assertEqual(snap['dates'], live['dates'])
+        self.assertEqual(snap['Vt'], live['Vt'])
+        self.assertEqual(snap['weights'], [{k: float(v) for k, v in w.items()} for w in live['weights']])
+        return snap
+
+    def test_read_never_writes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            snap = portfolio_snapshot_series(portfolio=self.p, start=T0, end=END, as_iso_strings=True)
+            resp = self.client.get(f'/charts/portfolios/{self.p.id}/', {'fecha_inicio': T0, 'fecha_fin': END})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'investments_portfoliosnapshot' in q['sql']
+                          and not q['sql'].startswith('SELECT')])
+        self.assertEqual(self.snapshot_dates(), [])
+
+        # incompleto -> se sirve la serie en vivo
+        live = portfolio_time_series(portfolio=self.p, start=T0, end=END, as_iso_strings=True)
+        self.assertEqual(snap['dates'][0], T0.isoformat())
+        self.assertEqual(snap['Vt'], live['Vt'])
+        self.assertEqual(snap['weights'], [{k: float(v) for k, v in w.items()} for w in live['weights']])
+
+    def test_refresh_fills_once(self):
+        self.assertEqual(refresh_portfolio_snapshots(portfolio=self.p), DAYS)
+        self.assert_snapshots_match_live()
+        self.assertEqual(
+            portfolio_snapshot_series(portfolio=self.p, start=T0, end=END, as_iso_strings=True)['dates'][0],
+            T0.isoformat(),
+        )
+        with self.assertNumQueries(2):  # última fecha + días existentes
+            self.assertEqual(refresh_portfolio_snapshots(portfolio=self.p), 0)
+
+    def test_refresh_computes_only_missing_sub_range(self):
+        refresh_portfolio_snapshots(portfolio=self.p)
+        gap = [MID, MID + timedelta(days=2)]
+        PortfolioSnapshot.objects.filter(portfolio=self.p, date__in=gap).delete()
+        with mock.patch.object(services, 'iter_portfolio_time_series', wraps=services.iter_portfolio_time_series) as it:
+            self.assertEqual(refresh_portfolio_snapshots(portfolio=self.p), 2)
+        self.assertEqual((it.call_args.kwargs['start'], it.call_args.kwargs['end']), tuple(gap))
+        self.assert_snapshots_match_live()
+
+    def test_trade_invalidates_from_trade_date_and_refills_on_commit(self):
+        refresh_portfolio_snapshots(portfolio=self.p)
+        before = self.assert_snapshots_match_live()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trade()
+            self.assertEqual(self.snapshot_dates(), [T0 + timedelta(days=k) for k in range((MID - T0).days)])
+
+        after = self.assert_snapshots_match_live()
+        i = (MID - T0).days
+        self.assertEqual(after['weights'][:i], before['weights'][:i])
+        self.assertNotEqual(after['weights'][i]['A'], before['weights'][i]['A'])
+
+    def test_price_change_invalidates_that_day(self):
+        refresh_portfolio_snapshots(portfolio=self.p)
+        before = self.assert_snapshots_match_live()
+        price = Price.objects.get(asset=self.b, date=MID)
+        price.price *= 2
+        with self.captureOnCommitCallbacks(execute=True):
+            price.save()
+            self.assertNotIn(MID, self.snapshot_dates())
+            self.assertEqual(len(self.snapshot_dates()), DAYS - 1)
+
+        after = self.assert_snapshots_match_live()
+        i = (MID - T0).days
+        self.assertNotEqual(after['Vt'][i], before['Vt'][i])
+        self.assertEqual(after['Vt'][i + 1], before['Vt'][i + 1])
+
+    def test_price_change_on_t0_invalidates_portfolio(self):
+        refresh_portfolio_snapshots(portfolio=self.p)
+        price = Price.objects.get(asset=self.b, date=T0)
+        price.price += 1
+        with self.captureOnCommitCallbacks(execute=True):
+            price.save()
+            self.assertEqual(self.snapshot_dates(), [])
+        self.assert_snapshots_match_live()
+
+    def test_asset_rename_keeps_snapshots(self):
+        refresh_portfolio_snapshots(portfolio=self.p)
+        self.a.name = 'A renombrado'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.a.save()
+        self.assertEqual(len(self.snapshot_dates()), DAYS)
+        snap = self.assert_snapshots_match_live()
+        self.assertIn('A renombrado', snap['weights'][0])
+        self.assertNotIn('A', snap['weights'][0])
+
+    def test_rebuild_command(self):
+        call_command('rebuild_snapshots', stdout=mock.Mock())
+        self.assert_snapshots_match_live()
+        call_command('rebuild_snapshots', '--clear', portfolios=[self.p.id], stdout=mock.Mock())
+        self.assertEqual(self.snapshot_dates(), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AssetRenameCacheTests(TransactionTestCase):
+    """Los nombres viajan en la cache de unidades iniciales: un rename la invalida."""
+
+    def setUp(self):
+        cache.clear()
+        create_portfolio_data(self)
+
+    def test_live_series_uses_new_name(self):
+        portfolio_time_series(portfolio=self.p, start=T0, end=T0)
+        self.a.name = 'A renombrado'
+        self.a.save()
+        weights = portfolio_time_series(portfolio=self.p, start=T0, end=T0)['weights'][0]
+        self.assertEqual(sorted(weights), ['A renombrado', 'B', 'C'])
@@ -0,0 +1,21 @@
+from investments.selectors import portfolio_time_series
+
+from .base import DAYS, END, T0, PortfolioDataTestCase, ReferenceAssertions
+
+
+class FloatPathTests(ReferenceAssertions, PortfolioDataTestCase):
+    """El camino float64 (NumPy) contra el cálculo en Decimal: V_t y pesos dentro de 1e-8."""
+
+    def test_time_series_matches_decimal_path(self):
+        self.trade()
+        for use_cache in (True, False):
+            data = portfolio_time_series(portfolio=self.p, start=T0, end=END, use_cache=use_cache)
+            self.assertEqual(len(data['dates']), DAYS)
+            for d, vt, weights in zip(data['dates'], data['Vt'], data['weights']):
+                self.assert_matches_reference(d, vt, weights)
+
+    def test_time_series_without_trades_matches_decimal_path(self):
+        self.trade()
+        data = portfolio_time_series(portfolio=self.p, start=T0, end=END, use_trades=False)
+        for d, vt, weights in zip(data['dates'], data['Vt'], data['weights']):
+            self.assert_matches_reference(d, vt, weights, use_trades=False)
@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+
+from investments.models import Asset, HoldingAdjustment, Price
+from investments.services import apply_trade, ensure_demo_trade_applied
+
+from .base import MID, T0, PortfolioDataTestCase
+
+
+class TradeIdempotencyTests(PortfolioDataTestCase):
+    """apply_trade + UniqueConstraint 'uniq_hadj' + ignore_conflicts: reintentos no duplican ajustes."""
+
+    def test_repeated_trade_is_not_duplicated(self):
+        first = self.trade()
+        second = self.trade()
+        self.assertEqual(first, second)
+        self.assertEqual(HoldingAdjustment.objects.filter(portfolio=self.p).count(), 2)
+
+    def test_different_trade_is_recorded(self):
+        self.trade()
+        self.trade(value=Decimal('1000'))
+        self.assertEqual(HoldingAdjustment.objects.filter(portfolio=self.p).count(), 4)
+        sold = HoldingAdjustment.objects.filter(portfolio=self.p, asset=self.a).aggregate(s=Sum('delta_units'))['s']
+        self.assertLess(sold, 0)
+
+
+class TradePricesTests(PortfolioDataTestCase):
+    """Precios de ambos lados del trade en una query; fallback al precio anterior en otra."""
+
+    VALUE = Decimal('1000')
+
+    def expected_units(self, asset, d):
+        price = Price.objects.get(asset=asset, date=d).price
+        return (self.VALUE / price).quantize(Decimal('0.00000001'), rounding=ROUND_HALF_UP)
+
+    def price_queries(self, d):
+        with CaptureQueriesContext(connection) as ctx:
+            units = self.trade(d=d, value=self.VALUE)
+        return units, [q for q in ctx.captured_queries if 'FROM "investments_price"' in q['sql']]
+
+    def test_both_prices_in_one_query(self):
+        units, queries = self.price_queries(MID)
+        self.assertEqual(len(queries), 1, queries)
+        self.assertEqual(units, {
+            'units_sell': self.expected_units(self.a, MID), 'units_buy': self.expected_units(self.c, MID),
+        })
+
+    def test_fallback_to_previous_price_for_both_sides(self):
+        Price.objects.filter(asset__in=[self.a, self.c], date=MID).delete()
+        units, queries = self.price_queries(MID)
+        self.assertEqual(len(queries), 2, queries)  # precios del día + anteriores de los faltantes
+        prev = MID - timedelta(days=1)
+        self.assertEqual(units, {
+            'units_sell': self.expected_units(self.a, prev), 'units_buy': self.expected_units(self.c, prev),
+        })
+
+    def test_missing_price_raises(self):
+        Price.objects.filter(asset=self.c, date=MID).delete()
+        with self.assertRaises(Price.DoesNotExist):
+            apply_trade(portfolio=self.p, d=MID, asset_sell=self.a, value_sell=self.VALUE,
+                        asset_buy=self.c, value_buy=self.VALUE, fallback_to_previous_price=False)
+        with self.assertRaises(Price.DoesNotExist):
+            self.trade(d=T0 - timedelta(days=1))
+        self.assertFalse(HoldingAdjustment.objects.exists())
+
+
+class EnsureDemoTradeTests(PortfolioDataTestCase):
+    """Trade demo del enunciado: 15/05/2022 vende 200M de 'EEUU' y compra 200M de 'Europa'."""
+
+    DEMO_DATE = date(2022, 5, 15)
+
+    def demo_assets(self, *names):
+        for name in names:
+            asset = Asset.objects.create(name=name)
+            Price.objects.create(asset=asset, date=self.DEMO_DATE, price=Decimal('100'))
+
+    def asset_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            applied = ensure_demo_trade_applied(portfolio=self.p)
+        return applied, [q for q in ctx.captured_queries if 'FROM "investments_asset"' in q['sql']]
+
+    def test_applies_trade_with_one_asset_query(self):
+        self.demo_assets('EEUU', 'Europa')
+        applied, queries = self.asset_queries()
+        self.assertTrue(applied)
+        self.assertEqual(len(queries), 1, queries)
+        self.assertEqual(
+            dict(HoldingAdjustment.objects.filter(portfolio=self.p).values_list('asset__name', 'delta_units')),
+            {'EEUU': Decimal('-2000000'), 'Europa': Decimal('2000000')},
+        )
+
+    def test_missing_demo_asset(self):
+        self.demo_assets('EEUU')
+        applied, queries = self.asset_queries()
+        self.assertFalse(applied)
+        self.assertEqual(len(queries), 1, queries)
+        self.assertFalse(HoldingAdjustment.objects.exists())
+
+    def test_missing_demo_price(self):
+        self.demo_assets('EEUU')
+        Asset.objects.create(name='Europa')
+        self.assertFalse(ensure_demo_trade_applied(portfolio=self.p))
+
+    def test_existing_adjustments_skip_lookup(self):
+        self.trade()
+        with self.assertNumQueries(1):
+            self.assertTrue(ensure_demo_trade_applied(portfolio=self.p))
@@ -1,78 +1,60 @@
 from django.shortcuts import render, get_object_or_404
-from investments.models import Portfolio, Price
-from investments.selectors import portfolio_time_series, last_price_date
+from investments.models import Portfolio, InitialWeight
+from investments.selectors import portfolio_time_series, portfolio_snapshot_series, last_price_date
 from investments.services import ensure_demo_trade_applied
 from django.http import HttpResponseBadRequest
-from datetime import datetime, date
+from datetime import date
+from investments.dates import ensure_date
 
-def _parse_date(d):
-    if isinstance(d, date):
-        return d
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y"):
+def _render_portfolio_charts(request, portfolio_id, use_trades):
+    # Solo las columnas que usan la vista, la plantilla y los selectors
+    p = get_object_or_404(Portfolio.objects.only('id', 'name', 'initial_date', 'initial_value'), pk=portfolio_id)
+    if use_trades:
+        # Intentamos aplicar el trade demo automáticamente si procede (facilita el uso al clonar)
         try:
-            return datetime.strptime(d, fmt).date()
-        except (TypeError, ValueError):
-            continue
-    raise ValueError(f"Fecha inválida: {d}")
-
-def portfolio_charts(request, portfolio_id):
-    """Con trades (por defecto)."""
-    p = get_object_or_404(Portfolio, pk=portfolio_id)
-    # Intentamos aplicar el trade demo automáticamente si procede (facilita el uso al clonar)
-    try:
-        ensure_demo_trade_applied(portfolio=p)
-    except Exception:
-        # No queremos romper la vista si algo falla aquí; en su lugar, continuamos sin abortar.
-        pass
+            ensure_demo_trade_applied(portfolio=p)
+        except Exception:
+            # No queremos romper la vista si algo falla aquí; en su lugar, continuamos sin abortar.
+            pass
     fi_str = request.GET.get('fecha_inicio', p.initial_date.isoformat())
     ff_str = request.GET.get('fecha_fin', p.initial_date.isoformat())
-    fi = _parse_date(fi_str)
-    ff = _parse_date(ff_str)
-    
+    fi = ensure_date(fi_str)
+    ff = ensure_date(ff_str)
+
     last_date = last_price_date()
     if last_date and ff > last_date:
         return HttpResponseBadRequest(f"fecha_fin no puede ser mayor que {last_date.isoformat()}")
 
-    data = portfolio_time_series(portfolio=p, start=fi, end=ff, use_trades=True)
-
-    dates = [d.isoformat() for d in data["dates"]]
+    if use_trades:
+        # Serie con trades desde los snapshots materializados (un range scan)
+        data = portfolio_snapshot_series(portfolio=p, start=fi, end=ff, as_iso_strings=True)
+    else:
+        data = portfolio_time_series(portfolio=p, start=fi, end=ff, use_trades=False, as_iso_strings=True)
+    dates = data["dates"]
     vt = [float(v) for v in data["Vt"]]
-    asset_names = sorted({k for day in data["weights"] for k in day.keys()})
-    series = {name: [float(day.get(name, 0.0)) for day in data["weights"]] for name in asset_names}
+    # Activos desde los pesos iniciales (fuente autoritativa) y series en una sola pasada por día
+    asset_names = sorted(InitialWeight.objects.filter(portfolio=p).values_list('asset__name', flat=True))
+    series = {name: [] for name in asset_names}
+    for day in data["weights"]:
+        for name, values in series.items():
+            values.append(float(day.get(name, 0.0)))
 
     return render(request, "investments/portfolio_charts.html", {
         "portfolio": p, "dates": dates, "vt": vt, "assets": asset_names, "series": series,
     })
 
+def portfolio_charts(request, portfolio_id):
+    """Con trades (por defecto)."""
+    return _render_portfolio_charts(request, portfolio_id, use_trades=True)
+
 def portfolio_charts_no_trades(request, portfolio_id):
     """SIN trades (ignora Bonus 2)."""
-    p = get_object_or_404(Portfolio, pk=portfolio_id)
-    fi_str = request.GET.get('fecha_inicio', p.initial_date.isoformat())
-    ff_str = request.GET.get('fecha_fin', p.initial_date.isoformat())
-    fi = _parse_date(fi_str)
-    ff = _parse_date(ff_str)
-
-    last_date = last_price_date()
-    if last_date and ff > last_date:
-        return HttpResponseBadRequest(f"fecha_fin no puede ser mayor que {last_date.isoformat()}")
-    
-    data = portfolio_time_series(portfolio=p, start=fi, end=ff, use_trades=False)
-
-    dates = [d.isoformat() for d in data["dates"]]
-    vt = [float(v) for v in data["Vt"]]
-    asset_names = sorted({k for day in data["weights"] for k in day.keys()})
-    series = {name: [float(day.get(name, 0.0)) for day in data["weights"]] for name in asset_names}
-
-    return render(request, "investments/portfolio_charts.html", {
-        "portfolio": p, "dates": dates, "vt": vt, "assets": asset_names, "series": series,
-    })
+    return _render_portfolio_charts(request, portfolio_id, use_trades=False)
 
 def home(request):
     # Defaults: primer portafolio, fecha inicial del portafolio y última fecha de precios
-    p = Portfolio.objects.order_by('id').first()
-    start_default = p.initial_date if p else date(2022, 1, 1)
-    last_price = Price.objects.order_by('-date').first()
-    end_default = last_price.date if last_price else start_default
+    start_default = Portfolio.objects.order_by('id').values_list('initial_date', flat=True).first() or date(2022, 1, 1)
+    end_default = last_price_date() or start_default
 
     portfolios = Portfolio.objects.all().values('id', 'name')
     return render(request, "investments/home.html", {